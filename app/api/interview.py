@@ -9,6 +9,7 @@
 """
 import logging
 import io
+import asyncio
 import uuid
 from typing import Dict, Any
 from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Depends
@@ -63,7 +64,9 @@ async def initialize_interview_text(
         logger.info(f"Generated thread_id: {thread_id}")
 
         # InterviewGraph 초기화 처리 (Checkpointer가 상태 자동 저장)
-        next_question = interview_graph.initialize_interview(
+        # 그래프는 동기 Gemini/DB 호출을 하므로 스레드에서 실행 (이벤트 루프 블로킹 방지)
+        next_question = await asyncio.to_thread(
+            interview_graph.initialize_interview,
             user_id=current_user.user_id,
             record_id=request.record_id,
             difficulty=request.difficulty,
@@ -131,8 +134,9 @@ async def initialize_interview_audio(
         thread_id = f"interview_{current_user.user_id}_{record_id}_{uuid.uuid4().hex[:8]}"
         logger.info(f"Generated thread_id: {thread_id}")
 
-        # 3. InterviewGraph 초기화 처리 (Checkpointer가 상태 자동 저장)
-        next_question = interview_graph.initialize_interview(
+        # 3. InterviewGraph 초기화 처리 (Checkpointer가 상태 자동 저장, 스레드에서 실행)
+        next_question = await asyncio.to_thread(
+            interview_graph.initialize_interview,
             user_id=current_user.user_id,
             record_id=record_id,
             difficulty=difficulty,
@@ -196,7 +200,8 @@ async def chat_text(
             raise HTTPException(status_code=403, detail="Access denied to this interview")
 
         # Checkpointer에서 상태 조회하여 처리 (record_id는 state에서 추출)
-        next_question = _process_chat_with_checkpoint(
+        next_question = await asyncio.to_thread(
+            _process_chat_with_checkpoint,
             user_answer=request.answer,
             response_time=request.response_time,
             thread_id=thread_id
@@ -254,7 +259,8 @@ async def chat_audio(
         logger.info(f"Transcribed text: {text[:100]}...")
 
         # 2. Checkpointer에서 상태 조회하여 처리 (record_id는 state에서 추출)
-        next_question = _process_chat_with_checkpoint(
+        next_question = await asyncio.to_thread(
+            _process_chat_with_checkpoint,
             user_answer=text,
             response_time=response_time,
             thread_id=thread_id
@@ -340,22 +346,27 @@ async def get_interview_history(
     try:
         from app.models import InterviewSession, StudentRecord
         from app.database import get_db
-        from sqlalchemy.orm import joinedload
+        from sqlalchemy.orm import joinedload, selectinload, raiseload
 
         db = next(get_db())
 
         try:
             # InterviewSession 조회 (user_id로 필터링)
-            sessions = db.query(InterviewSession).filter(
+            # turns/record는 한 번에 로드하고, 그 외 관계의 지연 로딩(N+1)은 금지
+            sessions = db.query(InterviewSession).options(
+                selectinload(InterviewSession.turns),
+                joinedload(InterviewSession.record),
+                raiseload('*')
+            ).filter(
                 InterviewSession.user_id == current_user.user_id
             ).order_by(InterviewSession.started_at.desc()).all()
 
             history = []
             for session in sessions:
-                interview_logs = session.interview_logs or []
+                turns = session.turns  # selectin으로 세션 전체에 대해 한 번에 로드됨
 
                 # 질문 갯수
-                question_count = len(interview_logs)
+                question_count = len(turns)
 
                 # 전체 소요 시간 (완료 시간 - 시작 시간 또는 전체 응답 시간 합계)
                 total_duration = 0
@@ -363,12 +374,12 @@ async def get_interview_history(
                     total_duration = int((session.completed_at - session.started_at).total_seconds())
                 else:
                     # 완료 시간이 없으면 응답 시간 합계로 계산
-                    total_duration = sum(log.get('response_time', 0) for log in interview_logs)
+                    total_duration = sum(turn.response_time or 0 for turn in turns)
 
                 # sub_topic 리스트 (중복 제거)
                 sub_topics = list(set(
-                    log.get('sub_topic', '') for log in interview_logs
-                    if log.get('sub_topic')  # 빈 문자열 제거
+                    turn.sub_topic for turn in turns
+                    if turn.sub_topic  # 빈 문자열 제거
                 ))
 
                 # StudentRecord에서 title 조회
@@ -428,12 +439,15 @@ async def get_interview_logs(
     try:
         from app.database import get_db
         from app.models import InterviewSession
+        from sqlalchemy.orm import selectinload
 
         db = next(get_db())
 
         try:
-            # InterviewSession 조회
-            interview_session = db.query(InterviewSession).filter(
+            # InterviewSession 조회 (대화 로그를 반환하므로 turns를 함께 로드)
+            interview_session = db.query(InterviewSession).options(
+                selectinload(InterviewSession.turns)
+            ).filter(
                 InterviewSession.id == session_id
             ).first()
 
@@ -444,13 +458,13 @@ async def get_interview_logs(
             if interview_session.user_id != current_user.user_id:
                 raise HTTPException(status_code=403, detail="Access denied to this interview")
 
-            # interview_logs 반환
+            # interview_turns를 로그 형식으로 반환
             return {
                 "thread_id": interview_session.thread_id,
                 "difficulty": interview_session.difficulty,
                 "mode": interview_session.mode,
                 "started_at": interview_session.started_at.isoformat() if interview_session.started_at else None,
-                "logs": interview_session.interview_logs if interview_session.interview_logs else []
+                "logs": [turn.to_log() for turn in interview_session.turns]
             }
 
         finally:
@@ -516,7 +530,7 @@ async def analyze_interview_result(
             db.close()
 
         # 분석 실행
-        result = interview_graph.analyze_interview_result(interview_session.thread_id)
+        result = await asyncio.to_thread(interview_graph.analyze_interview_result, interview_session.thread_id)
 
         if "error" in result:
             raise HTTPException(status_code=404, detail=result.get("message"))
@@ -5,12 +5,11 @@ from sqlalchemy.orm import Session
 from typing import Optional
 import json
 import asyncio
-import io
 
 from app.database import get_db
-from app.models import StudentRecord, Question, QuestionSet
-from app.services.vector_service import vector_service
-from app.graphs.record_analysis import question_generation_graph, QuestionGenerationState
+from app.models import StudentRecord, QuestionSet
+from app.services.vector_service import get_vector_service
+from app.graphs.record_analysis import get_question_generation_graph, QuestionGenerationState
 from app.schemas import CreateRecordRequest, VectorizeRequest, GenerateQuestionsRequest, SSEProgressEvent, QuestionData
 from app.core.dependencies import get_current_user, CurrentUser
 
@@ -265,16 +264,14 @@ async def _process_vectorization_with_progress(
         # 1. S3에서 PDF 다운로드
         await send_progress(10, progress_queue)
 
-        import io
         from app.services.s3_service import s3_service
 
-        file_stream = s3_service.get_file_stream(s3_key)
-        if not file_stream:
+        # 블로킹 다운로드는 스레드에서 실행 (이벤트 루프 점유 방지)
+        pdf_bytes = await asyncio.to_thread(s3_service.download_to_buffer, s3_key)
+        if pdf_bytes is None:
             logger.error("S3 PDF download failed")
             raise Exception("S3 PDF download failed")
 
-        pdf_bytes = io.BytesIO(file_stream.read())
-
         await send_progress(20, progress_queue)
 
         # 진행률 콜백 래퍼 함수 (async lambda 대신)
@@ -282,7 +279,7 @@ async def _process_vectorization_with_progress(
             await send_progress(progress, progress_queue)
 
         # 2. 벡터화 (Gemini 청킹 + 임베딩 + DB 저장) - PDF 직접 전달
-        success, message, total_chunks = await vector_service.vectorize_pdf(
+        success, message, total_chunks = await get_vector_service().vectorize_pdf(
             pdf_bytes=pdf_bytes,  # PDF 바이트를 직접 전달
             record_id=record_id,
             db=local_db,  # 로컬 DB 세션 사용
@@ -340,6 +337,8 @@ async def question_generation_stream(
         request: 질문 생성 요청
         db: 데이터베이스 세션
     """
+    question_set_id = None
+    completed = False
     try:
         # 1. QuestionSet 생성
         question_set = QuestionSet(
@@ -352,16 +351,19 @@ async def question_generation_stream(
         db.add(question_set)
         db.commit()
         db.refresh(question_set)
+        question_set_id = question_set.id
 
-        logger.info(f"QuestionSet created: id={question_set.id}")
+        logger.info(f"QuestionSet created: id={question_set_id}")
 
         # 2. 초기 상태 생성
         initial_state = QuestionGenerationState(
             record_id=record_id,
+            set_id=question_set_id,
             target_school=request.target_school or "알 수 없음",
             target_major=request.target_major or "알 수 없음",
             interview_type=request.interview_type or "종합전형",
             current_category=None,
+            category_queue=[],
             processed_categories=[],
             all_questions=[],
             progress=0,
@@ -369,8 +371,16 @@ async def question_generation_stream(
             error=None
         )
 
-        # 3. LangGraph 실행 (스트리밍)
-        async for state_update in question_generation_graph.astream(initial_state):
+        # 3. LangGraph 실행 (스트리밍) - 노드별 변경분만 수신
+        saved_question_ids = []
+        error = None
+
+        async for state_update in get_question_generation_graph().astream(initial_state):
+            if 'saved_question_ids' in state_update:
+                saved_question_ids = state_update['saved_question_ids']
+            if 'error' in state_update:
+                error = state_update['error']
+
             # 진행률 이벤트 전송
             event = SSEProgressEvent(
                 type="processing",
@@ -379,40 +389,21 @@ async def question_generation_stream(
             )
             yield f"data: {event.model_dump_json()}\n\n"
 
-        # 4. 최종 상태 수신
-        final_state = state_update
-
-        # 5. 에러 체크
-        if final_state.get('error'):
+        # 4. 에러 체크
+        if error:
             error_event = SSEProgressEvent(
                 type="error",
                 progress=0,
-                message=final_state.get('error', '에러가 발생했습니다')
+                message=error
             )
             yield f"data: {error_event.model_dump_json()}\n\n"
             return
 
-        # 6. 질문 DB 저장 (set_id로 연결)
-        questions_to_save = final_state.get('all_questions', [])
-
-        if questions_to_save:
-            for q in questions_to_save:
-                question = Question(
-                    set_id=question_set.id,  # question_set의 ID 참조
-                    category=q.get('category', '기본'),
-                    content=q['content'],
-                    difficulty=q.get('difficulty', 'BASIC'),
-                    purpose=q.get('purpose'),
-                    answer_points=q.get('answer_points'),
-                    model_answer=q.get('model_answer'),
-                    evaluation_criteria=q.get('evaluation_criteria')
-                )
-                db.add(question)
+        # 5. 질문은 그래프의 finalize 노드에서 한 트랜잭션으로 저장됨
+        completed = True
+        logger.info(f"Saved {len(saved_question_ids)} questions for question_set {question_set_id}")
 
-            db.commit()
-            logger.info(f"Saved {len(questions_to_save)} questions for question_set {question_set.id}")
-
-        # 7. 완료 이벤트 전송
+        # 6. 완료 이벤트 전송
         complete_event = SSEProgressEvent(
             type="complete",
             progress=100,
@@ -429,6 +420,18 @@ async def question_generation_stream(
         )
         yield f"data: {error_event.model_dump_json()}\n\n"
 
+    finally:
+        # 에러/클라이언트 연결 끊김으로 완료되지 못한 QuestionSet 제거 (질문은 FK CASCADE로 함께 삭제)
+        if question_set_id is not None and not completed:
+            try:
+                db.rollback()
+                db.query(QuestionSet).filter(QuestionSet.id == question_set_id).delete()
+                db.commit()
+                logger.info(f"Discarded incomplete question_set {question_set_id}")
+            except Exception as cleanup_err:
+                db.rollback()
+                logger.error(f"Failed to discard question_set {question_set_id}: {cleanup_err}")
+
 
 @router.post("/{record_id}/generate-questions")
 async def generate_questions(
@@ -1,16 +1,16 @@
 """로컬 PDF 테스트용 API 엔드포인트 - S3 없이 직접 PDF 업로드 테스트"""
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
 from fastapi.responses import StreamingResponse
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, selectinload
 from typing import Optional, Dict, Any
 import json
 import asyncio
 import io
 
 from app.database import get_db
-from app.models import StudentRecord, Question, QuestionSet
-from app.services.vector_service import vector_service
-from app.graphs.record_analysis import question_generation_graph, QuestionGenerationState
+from app.models import StudentRecord, QuestionSet
+from app.services.vector_service import get_vector_service
+from app.graphs.record_analysis import get_question_generation_graph, QuestionGenerationState
 from app.schemas import SSEProgressEvent, GenerateQuestionsRequest
 from app.schemas import InitializeInterviewRequest, SimpleChatRequest, InterviewChatResponse
 
@@ -210,7 +210,7 @@ async def _process_local_pdf_vectorization(
             await send_progress(progress, progress_queue)
 
         # 벡터화 (Gemini 청킹 + 임베딩 + DB 저장) - PDF 직접 전달
-        success, message, total_chunks = await vector_service.vectorize_pdf(
+        success, message, total_chunks = await get_vector_service().vectorize_pdf(
             pdf_bytes=pdf_bytes,  # PDF 바이트를 직접 전달
             record_id=record_id,
             db=local_db,  # 로컬 DB 세션 사용
@@ -368,19 +368,19 @@ async def get_record_questions(record_id: int, db: Session = Depends(get_db)):
         from app.models import QuestionSet
 
         # 해당 record의 모든 question_sets 조회
-        question_sets = db.query(QuestionSet).filter(
+        question_sets = db.query(QuestionSet).options(
+            selectinload(QuestionSet.questions)
+        ).filter(
             QuestionSet.record_id == record_id
         ).all()
 
         if not question_sets:
             return {"questions": [], "total": 0, "message": "질문 세트가 없습니다. 먼저 질문을 생성해주세요."}
 
-        # 모든 세트의 질문 조회
+        # 모든 세트의 질문 조회 (questions는 selectinload 옵션으로 한 번에 로드됨)
         all_questions = []
         for qset in question_sets:
-            questions = db.query(Question).filter(
-                Question.set_id == qset.id
-            ).order_by(Question.category).all()
+            questions = sorted(qset.questions, key=lambda q: q.category)
 
             for q in questions:
                 all_questions.append({
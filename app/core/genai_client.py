@@ -0,0 +1,102 @@
+"""Google GenAI 클라이언트 공유 모듈
+
+서비스/그래프마다 genai.Client를 만들면 각자 별도의 HTTP 커넥션 풀을 유지하므로
+프로세스 전체에서 하나의 클라이언트를 공유합니다.
+Gemini 호출의 요청률 제한(토큰 버킷)과 재시도 백오프도 여기서 함께 관리합니다.
+"""
+import asyncio
+import random
+import threading
+import time
+from functools import lru_cache
+from google import genai
+from config import settings
+
+# Gemini 재시도 백오프 설정 (초)
+RETRY_BASE_DELAY = 0.5
+RETRY_MAX_DELAY = 10.0
+
+
+@lru_cache(maxsize=1)
+def get_genai_client() -> genai.Client:
+    """공유 genai.Client 반환 (최초 호출 시 생성)"""
+    return genai.Client(api_key=settings.google_api_key)
+
+
+def get_retry_delay(attempt: int, error: Exception) -> float:
+    """
+    재시도 대기 시간 계산
+
+    응답에 Retry-After 헤더가 있으면 그 값을 따르고, 없으면
+    지수 백오프 + full jitter (0 ~ base * 2^attempt, 최대 RETRY_MAX_DELAY)를 사용합니다.
+    """
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None) or {}
+    retry_after = headers.get('retry-after') or headers.get('Retry-After')
+
+    if retry_after:
+        try:
+            return min(float(retry_after), RETRY_MAX_DELAY)
+        except ValueError:
+            pass
+
+    return random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * (2 ** attempt)))
+
+
+def is_rate_limited(error: Exception) -> bool:
+    """Gemini 할당량 초과(429 RESOURCE_EXHAUSTED) 에러 여부"""
+    return getattr(error, 'code', None) == 429
+
+
+class AsyncTokenBucket:
+    """
+    비동기 토큰 버킷 요청률 제한기
+
+    초당 rate개씩 토큰이 보충되고 최대 capacity개까지 쌓입니다 (순간 버스트 허용량).
+    토큰 계산은 threading.Lock으로 보호하고 대기는 락 밖에서 하므로,
+    이벤트 루프의 비동기 호출(acquire)과 워커 스레드의 동기 호출(acquire_sync)이 함께 사용해도 안전합니다.
+    """
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _try_take(self) -> float:
+        """토큰 1개 차감 시도 (성공 시 0, 부족하면 다음 토큰까지 대기할 시간 반환)"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+            self._updated_at = now
+
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+
+            return (1 - self._tokens) / self.rate
+
+    async def acquire(self) -> None:
+        """토큰 1개를 얻을 때까지 대기"""
+        while (wait := self._try_take()) > 0:
+            await asyncio.sleep(wait)
+
+    def acquire_sync(self) -> None:
+        """토큰 1개를 얻을 때까지 대기 (동기 버전 - 워커 스레드용)"""
+        while (wait := self._try_take()) > 0:
+            time.sleep(wait)
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return False
+
+
+# 프로세스 전체에서 공유하는 Gemini 요청률 제한기
+gemini_rate_limiter = AsyncTokenBucket(
+    rate=settings.gemini_requests_per_minute / 60,
+    capacity=settings.gemini_concurrency
+)
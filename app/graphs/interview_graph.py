@@ -7,14 +7,16 @@ from typing import TypedDict, List, Dict, Any, Optional
 from langgraph.graph import StateGraph, END
 from langgraph.checkpoint.postgres import PostgresSaver
 from pydantic import BaseModel, Field
-from google import genai
 from google.genai import types
 from config import settings
+from app.core.genai_client import get_genai_client
 from app.database import SessionLocal
-from app.models import InterviewSession
+from app.models import InterviewSession, InterviewTurn
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import selectinload
 from sqlalchemy.sql import func
 import logging
-import json
+import orjson
 
 logger = logging.getLogger(__name__)
 
@@ -65,10 +67,11 @@ class GeneratedQuestion(BaseModel):
 
 # ==================== 하위 주제 정의 ====================
 
-SUB_TOPICS = [
-    "출결", "성적", "동아리", "리더십", 
+# 모듈 로드 시 한 번만 생성되는 읽기 전용 상수 (tuple)
+SUB_TOPICS = (
+    "출결", "성적", "동아리", "리더십",
     "인성/태도", "진로/자율", "독서", "봉사"
-]
+)
 
 
 # ==================== Interview Graph ====================
@@ -76,9 +79,11 @@ SUB_TOPICS = [
 class InterviewGraph:
     """실시간 면접 LangGraph"""
 
+    TURN_SAVE_RETRIES = 2  # 턴 번호 충돌(동시 저장) 시 재시도 횟수
+
     def __init__(self):
         # Google GenAI 클라이언트 초기화
-        self.client = genai.Client(api_key=settings.google_api_key)
+        self.client = get_genai_client()
         self.model = "gemini-2.5-flash"  # Free Tier 무제한 (Lite는 하루 20회 제한)
         self.types = types
 
@@ -90,15 +95,23 @@ class InterviewGraph:
         self._conn_string = self._conn_string.replace("postgresql+psycopg://", "postgresql://", 1)
 
         self._graph = None
+        self._workflow = None
 
     def get_graph(self):
         """그래프 반환 (checkpointer 없이 컴파일)"""
         if self._graph is None:
             # 그래프 빌드 및 컴파일 (checkpointer 없이)
-            self._graph = self._build_workflow().compile()
+            self._graph = self._get_workflow().compile()
 
         return self._graph
 
+    def _get_workflow(self) -> StateGraph:
+        """Workflow 반환 (최초 1회만 빌드 후 재사용)"""
+        if self._workflow is None:
+            self._workflow = self._build_workflow()
+
+        return self._workflow
+
     def _build_workflow(self) -> StateGraph:
         """Workflow 빌드 (컴파일 전)"""
         workflow = StateGraph(InterviewState)
@@ -217,7 +230,7 @@ JSON 형식으로 응답하세요."""
                 }
             )
             
-            result = json.loads(response.text)
+            result = orjson.loads(response.text)
 
             # INTRO 단계(자기소개)는 이미 initialize_interview에서 저장했으므로 건너뜀
             if state.get('interview_stage') != 'INTRO':
@@ -259,10 +272,11 @@ JSON 형식으로 응답하세요."""
         """새로운 주제 검색"""
         db = None
         try:
-            # 미중복 주제 선택
+            # 미중복 주제 선택 (set 조회로 O(1) 멤버십 검사)
+            asked_sub_topics = set(state.get('asked_sub_topics', []))
             remaining_topics = [
                 topic for topic in SUB_TOPICS
-                if topic not in state.get('asked_sub_topics', [])
+                if topic not in asked_sub_topics
             ]
 
             if not remaining_topics:
@@ -276,14 +290,16 @@ JSON 형식으로 응답하세요."""
 
             logger.info(f"Selected new topic: {new_topic}")
 
-            # 벡터 DB에서 관련 청크 검색 (DB 세션 재사용)
-            from app.services.vector_service import vector_service
+            # 벡터 DB에서 관련 청크 검색 (DB 세션 재사용, 난이도별 ef_search)
+            from app.services.vector_service import get_vector_service
+            from app.vector_tuning import ef_search_for_difficulty
 
             db = SessionLocal()
-            chunks = vector_service.search_chunks_by_topic(
+            chunks = get_vector_service().search_chunks_by_topic(
                 record_id=state['record_id'],
                 topic=new_topic,
-                db=db  # DB 세션 전달
+                db=db,  # DB 세션 전달
+                ef_search=ef_search_for_difficulty(state.get('difficulty'))
             )
 
             state['current_sub_topic'] = new_topic
@@ -355,7 +371,7 @@ JSON 형식으로 응답하세요."""
                 )
             )
 
-            result = json.loads(response.text)
+            result = orjson.loads(response.text)
 
             # 마지막 질문 업데이트 (state에만 저장, checkpoint 아님)
             state['last_question'] = result['question']
@@ -437,7 +453,7 @@ JSON 형식으로 응답하세요."""
 }
             )
 
-            result = json.loads(response.text)
+            result = orjson.loads(response.text)
 
             # 🔍 디버깅: 생성된 질문 로그
             logger.info(f"✅ Generated question: {result['question']}")
@@ -468,12 +484,13 @@ JSON 형식으로 응답하세요."""
                 try:
                     session = db.query(InterviewSession).filter(InterviewSession.id == session_id).first()
                     if session:
-                        # interview_logs에서 통계 계산
-                        interview_logs = session.interview_logs or []
-                        total_questions = len(interview_logs)
+                        # interview_turns에서 통계 계산 (DB 집계)
+                        total_questions, total_time = db.query(
+                            func.count(InterviewTurn.id),
+                            func.coalesce(func.sum(InterviewTurn.response_time), 0)
+                        ).filter(InterviewTurn.session_id == session_id).one()
 
-                        if interview_logs:
-                            total_time = sum(log.get('response_time', 0) for log in interview_logs)
+                        if total_questions:
                             avg_response_time = total_time // total_questions
 
                         # 세션 종료 상태로 업데이트
@@ -542,12 +559,13 @@ JSON 형식으로 응답하세요."""
                 difficulty=difficulty,
                 mode=mode,
                 status="IN_PROGRESS",
-                interview_logs=[{  # 첫 로그 저장
-                    "question": "자기소개 부탁드립니다.",
-                    "answer": first_answer,
-                    "response_time": response_time,
-                    "sub_topic": ""
-                }]
+                turns=[InterviewTurn(  # 첫 로그 저장
+                    turn_index=0,
+                    question="자기소개 부탁드립니다.",
+                    answer=first_answer,
+                    response_time=response_time,
+                    sub_topic=""
+                )]
             )
             db.add(interview_session)
             db.commit()
@@ -649,7 +667,7 @@ JSON 형식으로 응답하세요."""
 
             # PostgresSaver 컨텍스트 내에서 그래프 실행
             with PostgresSaver.from_conn_string(self._conn_string) as checkpointer:
-                graph = self._build_workflow().compile(checkpointer=checkpointer)
+                graph = self._get_workflow().compile(checkpointer=checkpointer)
                 config = {"configurable": {"thread_id": thread_id}}
                 result_state = graph.invoke(state, config=config)
 
@@ -687,7 +705,9 @@ JSON 형식으로 응답하세요."""
 
             # 1. DB에서 직접 InterviewSession 조회 (checkpoint 사용 안 함)
             db = SessionLocal()
-            interview_session = db.query(InterviewSession).filter(
+            interview_session = db.query(InterviewSession).options(
+                selectinload(InterviewSession.turns)
+            ).filter(
                 InterviewSession.thread_id == thread_id
             ).first()
 
@@ -698,7 +718,7 @@ JSON 형식으로 응답하세요."""
                 }
 
             # 2. InterviewSession에서 데이터 추출
-            answer_log = interview_session.interview_logs if interview_session.interview_logs else []
+            answer_log = [turn.to_log() for turn in interview_session.turns]
             difficulty = interview_session.difficulty
             avg_response_time = interview_session.avg_response_time or 0
             total_duration = interview_session.total_duration or 0
@@ -805,7 +825,7 @@ JSON 형식으로 응답하세요."""
                 }
             )
 
-            result = json.loads(response.text)
+            result = orjson.loads(response.text)
 
             # 6. InterviewSession 업데이트 (같은 db 사용)
             interview_session.status = "COMPLETED"
@@ -868,15 +888,12 @@ JSON 형식으로 응답하세요."""
                 db.close()
 
     def _save_interview_log(self, state: InterviewState, log_entry: Dict[str, Any]):
-        """InterviewSession에 대화 로그 저장
+        """InterviewSession에 대화 로그 저장 (interview_turns에 1행 추가)
 
         Args:
             state: 현재 면접 상태
             log_entry: 저장할 로그 엔트리
         """
-        import json
-        from sqlalchemy import text
-
         db = None
         try:
             db = SessionLocal()
@@ -888,31 +905,34 @@ JSON 형식으로 응답하세요."""
                 logger.error(f"❌ session_id is missing in state! Available keys: {list(state.keys())}")
                 return
 
-            # 행 잠금 없이 조회
-            interview_session = db.query(InterviewSession).filter(
-                InterviewSession.id == session_id
-            ).first()
-
-            if not interview_session:
-                logger.error(f"❌ InterviewSession not found for session_id: {session_id}")
-                return
-
-            # 기존 로그 가져오기
-            logs = list(interview_session.interview_logs) if interview_session.interview_logs else []
-            logs.append(log_entry)
-
-            # RAW SQL로 직접 업데이트 (SQLAlchemy ORM 우회)
-            # CAST 함수 사용 (:: 캐스팅은 SQLAlchemy 파라미터와 충돌)
-            db.execute(text("""
-                UPDATE interview_sessions
-                SET interview_logs = CAST(:logs AS JSON)
-                WHERE id = :session_id
-            """), {"logs": json.dumps(logs, ensure_ascii=False), "session_id": session_id})
-
-            # 즉시 커밋
-            db.commit()
-
-            logger.info(f"✅ Saved log to interview_session {session_id} (total logs: {len(logs)})")
+            # 다음 턴 번호 조회 후 저장 (기존 로그 전체를 읽지 않음)
+            # 동시 저장으로 (session_id, turn_index) UNIQUE 제약에 걸리면 번호를 다시 조회해 재시도
+            for attempt in range(self.TURN_SAVE_RETRIES + 1):
+                last_index = db.query(func.max(InterviewTurn.turn_index)).filter(
+                    InterviewTurn.session_id == session_id
+                ).scalar()
+                turn_index = 0 if last_index is None else last_index + 1
+
+                db.add(InterviewTurn(
+                    session_id=session_id,
+                    turn_index=turn_index,
+                    question=log_entry.get('question', ''),
+                    answer=log_entry.get('answer', ''),
+                    response_time=log_entry.get('response_time', 0),
+                    sub_topic=log_entry.get('sub_topic', '')
+                ))
+
+                # 즉시 커밋
+                try:
+                    db.commit()
+                    break
+                except IntegrityError:
+                    db.rollback()
+                    if attempt == self.TURN_SAVE_RETRIES:
+                        raise
+                    logger.warning(f"⚠️ Turn index {turn_index} already taken for session {session_id}, retrying")
+
+            logger.info(f"✅ Saved log to interview_session {session_id} (total logs: {turn_index + 1})")
 
         except Exception as e:
             logger.error(f"❌ Error saving interview log: {e}")
@@ -2,16 +2,18 @@ from typing import TypedDict, List, Dict, Any, Optional, Annotated
 from operator import add
 from pydantic import BaseModel, Field
 from langgraph.graph import StateGraph, END
-from google import genai
+from langgraph.config import get_stream_writer
+from sqlalchemy import insert
 from google.genai import types
-from config import settings
+from app.core.genai_client import get_genai_client, get_retry_delay, gemini_rate_limiter
+import asyncio
 import logging
-import json
+import orjson
 from datetime import datetime
+from functools import lru_cache
 
 logger = logging.getLogger(__name__)
 
-
 # ==================== Pydantic 모델 ====================
 
 class GeneratedQuestion(BaseModel):
@@ -37,20 +39,23 @@ class QuestionGenerationState(TypedDict):
     
     # 고정 값 (덮어쓰기)
     record_id: int
+    set_id: int  # 생성된 질문을 저장할 QuestionSet ID
     target_school: str
     target_major: str
     interview_type: str
     
     # 누적 값 (추가 - reducer 사용)
     processed_categories: Annotated[List[str], add]
-    all_questions: Annotated[List[Dict[str, Any]], add]
+    all_questions: Annotated[List[Dict[str, Any]], add]  # 생성된 질문 (finalize에서 한 번에 저장)
     failed_categories: Annotated[List[str], add]  # 실패한 카테고리 추적
     
     # 단일 값 (덮어쓰기)
     current_category: Optional[str]
+    category_queue: List[str]  # 처리 대기 중인 카테고리 (current_category 제외)
     progress: int
     status_message: str
     error: str
+    saved_question_ids: List[int]  # finalize에서 저장된 Question ID
 
 
 class QuestionGenerationGraph:
@@ -61,7 +66,7 @@ class QuestionGenerationGraph:
 
     def __init__(self):
         # Google GenAI 클라이언트 초기화
-        self.client = genai.Client(api_key=settings.google_api_key)
+        self.client = get_genai_client()
         self.model = "gemini-2.5-flash"  # Free Tier 무제한 (Lite는 하루 20회 제한)
         self.types = types
 
@@ -93,19 +98,17 @@ class QuestionGenerationGraph:
         # 컴파일
         return workflow.compile()
 
-    async def initialize(self, state: QuestionGenerationState) -> QuestionGenerationState:
-        """초기화"""
+    async def initialize(self, state: QuestionGenerationState) -> Dict[str, Any]:
+        """초기화 (변경된 필드만 반환)"""
         logger.info(f"Initializing question generation for record {state['record_id']}")
 
-        state['processed_categories'] = []
-        state['all_questions'] = []
-        state['failed_categories'] = []
-        state['current_category'] = self.CATEGORIES[0]
-        state['progress'] = 5
-        state['status_message'] = "질문 생성을 시작합니다"
-        state['error'] = None
-
-        return state
+        return {
+            "current_category": self.CATEGORIES[0],
+            "category_queue": self.CATEGORIES[1:],
+            "progress": 5,
+            "status_message": "질문 생성을 시작합니다",
+            "error": None
+        }
 
     async def process_category(self, state: QuestionGenerationState) -> QuestionGenerationState:
         """카테고리별 질문 생성 (내부 재시도 로직, SSE에 노출되지 않음)"""
@@ -127,11 +130,12 @@ class QuestionGenerationGraph:
                 
                 num_processed = len(state['processed_categories'])
                 progress = int(((num_processed + 1) / len(self.CATEGORIES)) * 90)
-                remaining_categories = [cat for cat in self.CATEGORIES if cat not in state['processed_categories'] + [current_category]]
+                category_queue = state.get('category_queue', [])
                 
                 return {
                     "processed_categories": [current_category],
-                    "current_category": remaining_categories[0] if remaining_categories else None,
+                    "current_category": category_queue[0] if category_queue else None,
+                    "category_queue": category_queue[1:],
                     "progress": progress,
                     "status_message": f"{current_category} 영역 데이터 없음, 다음 영역으로 넘어갑니다...",
                     "error": None
@@ -151,7 +155,8 @@ class QuestionGenerationGraph:
                         chunks=relevant_chunks,
                         target_school=state['target_school'],
                         target_major=state['target_major'],
-                        interview_type=state['interview_type']
+                        interview_type=state['interview_type'],
+                        progress=state.get('progress', 0)
                     )
 
                     # 질문 생성 실패 체크
@@ -167,24 +172,25 @@ class QuestionGenerationGraph:
                     logger.warning(f"  ❌ Attempt {attempt + 1} failed for {current_category}: {e}")
                     
                     if attempt < max_retries:
-                        # 재시도 대기 (1초)
-                        import asyncio
-                        await asyncio.sleep(1)
-                        logger.info(f"  🔄 Retrying {current_category}...")
+                        # 재시도 대기 (Retry-After 또는 지수 백오프 + jitter)
+                        delay = get_retry_delay(attempt, e)
+                        await asyncio.sleep(delay)
+                        logger.info(f"  🔄 Retrying {current_category} after {delay:.1f}s...")
                     else:
                         # 최대 재시도 초과: 에러 던짐
                         logger.error(f"  ❌ All {max_retries + 1} attempts failed for {current_category}")
                         raise Exception(f"{current_category} 카테고리 질문 생성 실패 (최대 {max_retries + 1}회 시도): {str(e)}")
 
-            # 3. 성공: 다음 카테고리로 이동
+            # 3. 성공: 다음 카테고리로 이동 (DB 저장은 finalize에서 전체를 한 트랜잭션으로)
             num_processed = len(state['processed_categories'])
             progress = int(((num_processed + 1) / len(self.CATEGORIES)) * 90)
-            remaining_categories = [cat for cat in self.CATEGORIES if cat not in state['processed_categories'] + [current_category]]
+            category_queue = state.get('category_queue', [])
             
             return {
                 "all_questions": questions,
                 "processed_categories": [current_category],
-                "current_category": remaining_categories[0] if remaining_categories else None,
+                "current_category": category_queue[0] if category_queue else None,
+                "category_queue": category_queue[1:],
                 "progress": progress,
                 "status_message": f"{current_category} 영역 분석 완료...",
                 "error": None
@@ -197,33 +203,39 @@ class QuestionGenerationGraph:
             
             num_processed = len(state['processed_categories'])
             progress = int(((num_processed + 1) / len(self.CATEGORIES)) * 90)
-            remaining_categories = [cat for cat in self.CATEGORIES if cat not in state['processed_categories'] + [current_category]]
+            category_queue = state.get('category_queue', [])
             
             return {
                 "processed_categories": [current_category],  # 처리된 것으로 표시
                 "failed_categories": [current_category],     # 실패 목록에 추가
-                "current_category": remaining_categories[0] if remaining_categories else None,
+                "current_category": category_queue[0] if category_queue else None,
+                "category_queue": category_queue[1:],
                 "progress": progress,
                 "status_message": f"{current_category} 질문 생성 실패로 건너뜁니다...",
                 "error": None  # 치명적 에러가 아니므로 error 필드는 None
             }
 
-    async def finalize(self, state: QuestionGenerationState) -> QuestionGenerationState:
-        """마무리"""
+    async def finalize(self, state: QuestionGenerationState) -> Dict[str, Any]:
+        """마무리 - 모든 카테고리의 질문을 한 트랜잭션으로 저장 (변경된 필드만 반환)"""
         failed_cats = state.get('failed_categories', [])
-        total_questions = len(state['all_questions'])
+
+        # 중간 실패/연결 끊김 시 일부 카테고리만 저장된 QuestionSet이 남지 않도록 마지막에 한 번에 저장
+        question_ids = await asyncio.to_thread(self._save_questions, state['set_id'], state['all_questions'])
+        total_questions = len(question_ids)
         
         if failed_cats:
             logger.warning(f"⚠️ Failed categories: {failed_cats}")
-            state['status_message'] = f"질문 생성 완료! 총 {total_questions}개 질문 생성. {len(failed_cats)}개 카테고리({', '.join(failed_cats)}) 실패로 건너뜀."
+            status_message = f"질문 생성 완료! 총 {total_questions}개 질문 생성. {len(failed_cats)}개 카테고리({', '.join(failed_cats)}) 실패로 건너뜀."
         else:
             logger.info(f"✅ All categories succeeded. Total questions: {total_questions}")
-            state['status_message'] = f"질문 생성 완료! 총 {total_questions}개 질문이 생성되었습니다."
+            status_message = f"질문 생성 완료! 총 {total_questions}개 질문이 생성되었습니다."
 
-        state['progress'] = 100
-        state['current_category'] = None
-
-        return state
+        return {
+            "saved_question_ids": question_ids,
+            "progress": 100,
+            "current_category": None,
+            "status_message": status_message
+        }
 
     async def _retrieve_relevant_chunks(
         self,
@@ -232,51 +244,108 @@ class QuestionGenerationGraph:
     ) -> List[Dict[str, Any]]:
         """
         벡터 DB에서 관련 청크 검색
+
+        동기 DB 세션 조회는 별도 스레드에서 실행 (이벤트 루프 블로킹 방지)
         """
-        from app.models import RecordChunk
-        from app.database import get_db
-        
         try:
-            # DB 세션 생성
-            db_generator = get_db()
-            db = next(db_generator)
-            
-            try:
-                # 카테고리별 청크 조회 (record_id와 category로 필터링)
-                chunks = db.query(RecordChunk).filter(
-                    RecordChunk.record_id == record_id,
-                    RecordChunk.category == category
-                ).order_by(RecordChunk.chunk_index).all()
-                
-                # 딕셔너리 형태로 변환
-                result = [
-                    {
-                        "text": chunk.chunk_text,
-                        "category": chunk.category
-                    }
-                    for chunk in chunks
-                ]
-                
-                logger.info(f"Retrieved {len(result)} chunks for category {category}")
-                return result
-                
-            finally:
-                db.close()
-                
+            result = await asyncio.to_thread(self._load_category_chunks, record_id, category)
+            logger.info(f"Retrieved {len(result)} chunks for category {category}")
+            return result
+
         except Exception as e:
             logger.error(f"Error retrieving chunks for category {category}: {e}")
             return []
 
+    def _load_category_chunks(
+        self,
+        record_id: int,
+        category: str
+    ) -> List[Dict[str, Any]]:
+        """
+        카테고리별 청크 조회 (record_id와 category로 필터링, chunk_index 순)
+        """
+        from app.models import RecordChunk
+        from app.database import SessionLocal
+
+        db = SessionLocal()
+        try:
+            # 필요한 컬럼만 조회 (ORM 엔티티 생성/identity map 등록 없이 튜플로 반환)
+            rows = db.query(RecordChunk.chunk_text, RecordChunk.category).filter(
+                RecordChunk.record_id == record_id,
+                RecordChunk.category == category
+            ).order_by(RecordChunk.chunk_index).all()
+
+            # 딕셔너리 형태로 변환
+            return [
+                {
+                    "text": chunk_text,
+                    "category": chunk_category
+                }
+                for chunk_text, chunk_category in rows
+            ]
+
+        finally:
+            db.close()
+
+    def _save_questions(
+        self,
+        set_id: int,
+        questions: List[Dict[str, Any]]
+    ) -> List[int]:
+        """
+        생성된 질문을 questions 테이블에 벌크 저장하고 ID 반환 (단일 트랜잭션)
+        """
+        from app.models import Question
+        from app.database import SessionLocal
+
+        if not questions:
+            return []
+
+        rows = [
+            {
+                "set_id": set_id,
+                "category": q.get('category', '기본'),
+                "content": q['content'],
+                "difficulty": q.get('difficulty', '기본'),
+                "purpose": q.get('purpose'),
+                "answer_points": q.get('answer_points'),
+                "model_answer": q.get('model_answer'),
+                "evaluation_criteria": q.get('evaluation_criteria')
+            }
+            for q in questions
+        ]
+
+        db = SessionLocal()
+        try:
+            question_ids = db.scalars(
+                insert(Question).returning(Question.id),
+                rows
+            ).all()
+            db.commit()
+
+            logger.info(f"Saved {len(question_ids)} questions for question_set {set_id}")
+            return list(question_ids)
+
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
     async def _generate_questions_for_category(
         self,
         category: str,
         chunks: List[Dict[str, Any]],
         target_school: str,
         target_major: str,
-        interview_type: str
+        interview_type: str,
+        progress: int = 0
     ) -> List[Dict[str, Any]]:
         """
-        카테고리별 질문 생성 (google.genai 사용)
+        카테고리별 질문 생성 (google.genai 스트리밍 사용)
+
+        응답을 토큰 단위로 수신하면서 새 질문이 작성되기 시작할 때마다
+        custom 스트림 이벤트로 진행 상황을 전송합니다.
         """
         try:
             # 청크 텍스트 결합 (모든 청크 사용)
@@ -335,8 +404,15 @@ class QuestionGenerationGraph:
                 required=["questions"]
             )
 
-            # Google GenAI로 구조화된 출력 생성 (비동기)
-            response = await self.client.aio.models.generate_content(
+            # Google GenAI로 구조화된 출력 스트리밍 생성 (비동기)
+            writer = get_stream_writer()
+            text_parts = []
+            question_key = '"content"'
+            tail = ""
+            started_questions = 0
+
+            await gemini_rate_limiter.acquire()
+            stream = await self.client.aio.models.generate_content_stream(
                 model=self.model,
                 contents=prompt,
                 config={
@@ -345,8 +421,28 @@ class QuestionGenerationGraph:
                 }
             )
 
+            async for chunk in stream:
+                chunk_text = chunk.text
+                if not chunk_text:
+                    continue
+
+                is_first_chunk = not text_parts
+                text_parts.append(chunk_text)
+
+                # 청크 경계에 걸친 키도 세기 위해 이전 청크의 꼬리를 붙여서 검사
+                window = tail + chunk_text
+                new_questions = window.count(question_key)
+                tail = window[-(len(question_key) - 1):]
+
+                if is_first_chunk or new_questions:
+                    started_questions += new_questions
+                    writer({
+                        "progress": progress,
+                        "status_message": f"{category} 영역 질문 생성 중... ({started_questions}개 작성 중)"
+                    })
+
             # JSON 파싱
-            result = json.loads(response.text)
+            result = orjson.loads("".join(text_parts))
             questions = result.get("questions", [])
 
             # category를 코드에서 직접 할당 (AI가 임의로 생성하지 않도록)
@@ -357,8 +453,9 @@ class QuestionGenerationGraph:
             return questions
 
         except Exception as e:
+            # 재시도 루프에서 백오프를 결정할 수 있도록 원본 예외를 그대로 전달
             logger.error(f"Error generating questions for {category}: {e}")
-            return []
+            raise
 
     def should_continue(self, state: QuestionGenerationState) -> str:
         """계속 진행 여부 판단"""
@@ -366,9 +463,8 @@ class QuestionGenerationGraph:
         if state.get('error'):
             return "end"
 
-        # 남은 카테고리 확인
-        remaining = [cat for cat in self.CATEGORIES if cat not in state.get('processed_categories', [])]
-        if remaining:
+        # 다음 카테고리가 지정되어 있으면 계속 진행
+        if state.get('current_category'):
             return "continue"
 
         return "end"
@@ -376,11 +472,24 @@ class QuestionGenerationGraph:
     async def astream(self, state: QuestionGenerationState):
         """
         비동기 스트리밍 실행 (SSE용)
-        """
-        async for event in self.graph.astream(state):
-            # 각 노드 실행 후 상태를 yield
-            for node_name, node_state in event.items():
-                yield node_state
-
 
-question_generation_graph = QuestionGenerationGraph()
+        노드가 반환한 변경분(delta)만 yield합니다. 누적 필드(all_questions 등)는
+        해당 노드에서 새로 추가된 항목만 포함되므로 호출 측에서 합산해야 합니다.
+        질문 생성 중에는 progress/status_message만 담긴 중간 이벤트도 함께 yield됩니다.
+        """
+        async for mode, event in self.graph.astream(state, stream_mode=["updates", "custom"]):
+            # 노드 내부에서 보낸 진행 상황 이벤트 (Gemini 스트리밍 중)
+            if mode == "custom":
+                yield event
+                continue
+
+            # 각 노드 실행 후 변경분만 yield
+            for node_name, node_update in event.items():
+                if node_update:
+                    yield node_update
+
+
+@lru_cache(maxsize=1)
+def get_question_generation_graph() -> QuestionGenerationGraph:
+    """공유 질문 생성 그래프 반환 (최초 호출 시 생성 - import 시점의 클라이언트 생성/그래프 컴파일 방지)"""
+    return QuestionGenerationGraph()
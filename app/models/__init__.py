@@ -1,21 +1,28 @@
-from sqlalchemy import Column, BigInteger, String, Text, Integer, Boolean, DateTime, ForeignKey, JSON, CheckConstraint
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, BigInteger, String, Text, Integer, Boolean, DateTime, ForeignKey, Index, Enum, UniqueConstraint
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import relationship, deferred
 from sqlalchemy.sql import func
-from pgvector.sqlalchemy import Vector
+from pgvector.sqlalchemy import HALFVEC
 from app.database import Base
+from app.vector_tuning import HNSW_M, HNSW_EF_CONSTRUCTION
+
+
+# PostgreSQL native ENUM 타입 (4바이트 고정폭, 값 검증은 DB가 수행)
+RecordStatus = Enum('PENDING', 'ANALYZING', 'READY', 'FAILED', name='record_status')
+QuestionDifficulty = Enum('기본', '압박', '심화', name='question_difficulty')
 
 
 class User(Base):
     __tablename__ = "users"
 
-    id = Column(BigInteger, primary_key=True, index=True)
+    id = Column(BigInteger, primary_key=True)
     email = Column(String(255), unique=True, nullable=False, index=True)
     password = Column(String(255), nullable=False)
     name = Column(String(100), nullable=False)
     marketing_agreement = Column(Boolean, default=False)
     role = Column(String(20), default='USER')
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now())  # UPDATE 시 DB 트리거(users_set_updated_at)가 갱신
 
     student_records = relationship("StudentRecord", back_populates="user", cascade="all, delete-orphan")
 
@@ -23,11 +30,11 @@ class User(Base):
 class StudentRecord(Base):
     __tablename__ = "student_records"
 
-    id = Column(BigInteger, primary_key=True, index=True)
+    id = Column(BigInteger, primary_key=True)
     user_id = Column(BigInteger, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
     title = Column(String(255), nullable=False)
     s3_key = Column(String(512), nullable=False)
-    status = Column(String(20), default="PENDING")  # PENDING, ANALYZING, READY, FAILED
+    status = Column(RecordStatus, default="PENDING")  # PENDING, ANALYZING, READY, FAILED
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     user = relationship("User", back_populates="student_records")
     record_chunks = relationship("RecordChunk", back_populates="record", cascade="all, delete-orphan")
@@ -37,14 +44,31 @@ class StudentRecord(Base):
 class RecordChunk(Base):
     """벡터화된 생기부 청크 테이블"""
     __tablename__ = "record_chunks"
+    __table_args__ = (
+        # 카테고리별 청크 조회 (record_id + category, chunk_index 순 정렬을 인덱스 순서로 처리)
+        Index('idx_rc_record_category_chunk', 'record_id', 'category', 'chunk_index'),
+        # 코사인 유사도 검색용 HNSW 인덱스
+        Index(
+            'record_chunks_embedding_idx',
+            'embedding',
+            postgresql_using='hnsw',
+            postgresql_ops={'embedding': 'halfvec_cosine_ops'},
+            postgresql_with={'m': HNSW_M, 'ef_construction': HNSW_EF_CONSTRUCTION}
+        ),
+    )
+    # 벌크 INSERT 후 서버 기본값(id, created_at)을 RETURNING으로 되읽지 않음
+    __mapper_args__ = {"eager_defaults": False}
 
-    id = Column(BigInteger, primary_key=True, index=True)
+    # 컬럼 순서: 고정 길이 컬럼 → 가변 길이(TOAST 대상) 컬럼 (행 정렬 패딩 최소화)
+    id = Column(BigInteger, primary_key=True)
     record_id = Column(Integer, ForeignKey("student_records.id", ondelete="CASCADE"), nullable=False, index=True)
-    chunk_text = Column(Text, nullable=False)
     chunk_index = Column(Integer, nullable=False)
-    category = Column(String(50), nullable=False, index=True)  # 출결, 성적, 세특, 수상, 독서, 진로, 기타
-    embedding = Column(Vector(768))  # text-embedding-004: 768차원
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    category = Column(String(50), nullable=False)  # 출결, 성적, 세특, 수상, 독서, 진로, 기타
+    # 768차원 halfvec (FP16 저장으로 vector 대비 절반 크기)
+    # 유사도 검색은 raw SQL로 수행하므로 ORM 조회 시에는 지연 로딩 (청크당 ~1.5KB 전송 생략)
+    embedding = deferred(Column(HALFVEC(768)))
+    chunk_text = Column(Text, nullable=False)
 
     record = relationship("StudentRecord", back_populates="record_chunks")
 
@@ -53,7 +77,7 @@ class QuestionSet(Base):
     """질문 생성 세트 - 대학/전공/전형 정보"""
     __tablename__ = "question_sets"
 
-    id = Column(BigInteger, primary_key=True, index=True)
+    id = Column(BigInteger, primary_key=True)
     record_id = Column(BigInteger, ForeignKey("student_records.id", ondelete="CASCADE"), nullable=False, index=True)
     target_school = Column(String(100), nullable=False)  # 예: "한양대"
     target_major = Column(String(100), nullable=False)  # 예: "컴퓨터학부"
@@ -69,17 +93,18 @@ class Question(Base):
     """생성된 질문 테이블"""
     __tablename__ = "questions"
     __table_args__ = (
-        CheckConstraint("difficulty IN ('기본', '압박', '심화')", name='questions_difficulty_check'),
+        # 세트 내 카테고리/난이도별 질문 조회
+        Index('idx_q_set_cat_diff', 'set_id', 'category', 'difficulty'),
     )
 
-    id = Column(BigInteger, primary_key=True, index=True)
+    id = Column(BigInteger, primary_key=True)
     set_id = Column(BigInteger, ForeignKey("question_sets.id", ondelete="CASCADE"), nullable=False, index=True)
 
     # 카테고리: 출결, 성적, 세특, 수상, 독서, 진로, 기타
-    category = Column(String(50), nullable=False, index=True)
+    category = Column(String(50), nullable=False)
 
     # 난이도: 기본, 압박, 심화
-    difficulty = Column(String(20), default='기본', nullable=False, index=True)
+    difficulty = Column(QuestionDifficulty, default='기본', nullable=False)
 
     # 질문 내용
     content = Column(Text, nullable=False)
@@ -102,7 +127,7 @@ class InterviewSession(Base):
     """면접 세션 정보 - user_id와 thread_id 매핑"""
     __tablename__ = "interview_sessions"
 
-    id = Column(BigInteger, primary_key=True, index=True)
+    id = Column(BigInteger, primary_key=True)
     user_id = Column(BigInteger, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
     record_id = Column(BigInteger, ForeignKey("student_records.id", ondelete="CASCADE"), nullable=False, index=True)
 
@@ -125,13 +150,47 @@ class InterviewSession(Base):
     total_questions = Column(Integer, default=0)
     total_duration = Column(Integer, nullable=True)  # 전체 소요 시간 (초)
 
-    # 대화 로그 (JSONB) - 질문, 답변, 응답 시간 저장
-    interview_logs = Column(JSON, nullable=True)
-    # 예: [{"question": "...", "answer": "...", "response_time": 45, "sub_topic": "..."}, ...]
-
-    # 최종 결과
-    final_report = Column(JSON, nullable=True)
+    # 최종 결과 (JSONB - 바이너리 저장)
+    final_report = Column(JSONB, nullable=True)
 
     # 관계
     user = relationship("User")
     record = relationship("StudentRecord")
+
+    # 대화 로그 - 질문, 답변, 응답 시간 (턴 순서대로)
+    # 기본은 지연 로딩 - to_log()가 필요한 조회에서만 selectinload 옵션 사용
+    turns = relationship(
+        "InterviewTurn",
+        back_populates="session",
+        order_by="InterviewTurn.turn_index",
+        cascade="all, delete-orphan"
+    )
+
+
+class InterviewTurn(Base):
+    """면접 대화 턴 - 질문/답변 1쌍 (interview_sessions의 정규화된 대화 로그)"""
+    __tablename__ = "interview_turns"
+    __table_args__ = (
+        # 세션 내 턴 번호 중복 방지 (조회용 인덱스 겸용)
+        UniqueConstraint('session_id', 'turn_index', name='uq_interview_turns_session_turn'),
+    )
+
+    id = Column(BigInteger, primary_key=True)
+    session_id = Column(BigInteger, ForeignKey("interview_sessions.id", ondelete="CASCADE"), nullable=False)
+    turn_index = Column(Integer, nullable=False)  # 0부터 시작 (0: 자기소개)
+
+    question = Column(Text)
+    answer = Column(Text)
+    response_time = Column(Integer, default=0)  # 초 단위
+    sub_topic = Column(String(100))
+
+    session = relationship("InterviewSession", back_populates="turns")
+
+    def to_log(self) -> dict:
+        """API 응답용 로그 딕셔너리로 변환"""
+        return {
+            "question": self.question,
+            "answer": self.answer,
+            "response_time": self.response_time or 0,
+            "sub_topic": self.sub_topic or ""
+        }
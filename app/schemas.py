@@ -1,5 +1,5 @@
 """Pydantic schemas for request/response validation"""
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from typing import Optional, List, Dict
 
 
@@ -28,6 +28,8 @@ class GenerateQuestionsRequest(BaseModel):
 
 class QuestionData(BaseModel):
     """생성된 질문 데이터"""
+    model_config = ConfigDict(frozen=True, extra='ignore')
+
     category: str = Field(..., description="질문 카테고리 (출결, 성적, 세특, 창체, 행특)")
     content: str = Field(..., description="질문 내용")
     difficulty: str = Field(..., description="난이도 (기본, 심화, 압박)")
@@ -39,7 +41,9 @@ class QuestionData(BaseModel):
 
 
 class SSEProgressEvent(BaseModel):
-    """SSE 진행률 이벤트"""
+    """SSE 진행률 이벤트 (진행률 틱마다 생성되므로 불변 모델로 유지)"""
+    model_config = ConfigDict(frozen=True, extra='ignore')
+
     type: str = Field(..., description="이벤트 타입 (progress, complete, error)")
     progress: int = Field(..., description="진행률 (0-100)")
     message: Optional[str] = Field(None, description="진행 상태 메시지")
@@ -49,6 +53,8 @@ class SSEProgressEvent(BaseModel):
 
 class QuestionGenerationInput(BaseModel):
     """질문 생성 입력 (LangGraph용)"""
+    model_config = ConfigDict(frozen=True, extra='ignore')
+
     category: str
     chunk_texts: List[str]
     target_school: str
@@ -5,13 +5,13 @@ TTS: Google Cloud Text-to-Speech
 """
 import logging
 import io
-import os
+import asyncio
+import hashlib
 from typing import Optional
-from google import genai
 from google.genai import types as genai_types
 from google.cloud import texttospeech
 from config import settings
-import tempfile
+from app.core.genai_client import get_genai_client
 
 logger = logging.getLogger(__name__)
 
@@ -19,10 +19,13 @@ logger = logging.getLogger(__name__)
 class AudioService:
     """오디오 처리 서비스"""
 
+    SPEAKING_RATE = 0.9  # 약간 느리게 (면접관의 차분한 태도)
+
     def __init__(self):
         # Google GenAI 클라이언트 (STT용)
-        self.genai_client = genai.Client(api_key=settings.google_api_key)
+        self.genai_client = get_genai_client()
         self.stt_model = "gemini-2.5-flash"
+        self.stt_config = genai_types.GenerateContentConfig(temperature=0.0)  # 호출마다 재생성하지 않음
         
         # Google Cloud TTS 클라이언트
         try:
@@ -38,6 +41,25 @@ class AudioService:
             logger.error(f"Failed to initialize TTS client: {e}")
             self.tts_client = None
     
+    def warm_up(self, timeout: float = None) -> None:
+        """
+        TTS gRPC 채널 워밍업 (채널 연결 + 인증 토큰 발급을 미리 수행)
+
+        첫 synthesize_speech 호출이 채널 설정 비용까지 떠안지 않도록 앱 시작 시 호출합니다.
+        과금되지 않는 list_voices 요청을 사용합니다.
+
+        Args:
+            timeout: list_voices 요청 타임아웃 (초, None이면 클라이언트 기본값)
+        """
+        if not self.tts_client:
+            return
+
+        try:
+            self.tts_client.list_voices(language_code="ko-KR", timeout=timeout)
+            logger.info("TTS client warmed up")
+        except Exception as e:
+            logger.warning(f"TTS warm-up failed: {e}")
+
     async def transcribe_audio(
         self, 
         audio_bytes: bytes,
@@ -65,12 +87,10 @@ class AudioService:
             # STT 요청
             prompt = "이 오디오는 면접 답변입니다. 내용을 그대로 텍스트로 변환해주세요."
 
-            response = self.genai_client.models.generate_content(
+            response = await self.genai_client.aio.models.generate_content(
                 model=self.stt_model,
                 contents=[prompt, audio_part],
-                config={
-                    "temperature": 0.0
-                }
+                config=self.stt_config
             )
             
             text = response.text.strip()
@@ -104,15 +124,26 @@ class AudioService:
                 logger.warning("TTS client not initialized")
                 return None
             
+            from app.services.s3_service import s3_service
+
+            # 한국어 남성 음성 (권장)
+            if not voice_name:
+                voice_name = "ko-KR-Neural2-C"  # 차분한 남성 음성
+
+            # 동일한 (텍스트, 음성, 언어, 속도) 조합은 S3에 캐시된 음성 재사용
+            cache_key = f"{text}\x00{voice_name}\x00{language_code}\x00{self.SPEAKING_RATE}"
+            file_key = f"interview_audio/tts/{hashlib.blake2b(cache_key.encode('utf-8'), digest_size=16).hexdigest()}.mp3"
+
+            cached_url = await s3_service.get_presigned_url_if_exists(file_key)
+            if cached_url:
+                logger.info(f"TTS cache hit: {file_key}")
+                return cached_url
+
             logger.info(f"Converting text to speech: {len(text)} characters")
             
             # 음성 설정
             synthesis_input = texttospeech.SynthesisInput(text=text)
             
-            # 한국어 남성 음성 (권장)
-            if not voice_name:
-                voice_name = "ko-KR-Neural2-C"  # 차분한 남성 음성
-            
             voice = texttospeech.VoiceSelectionParams(
                 language_code=language_code,
                 name=voice_name
@@ -121,39 +152,24 @@ class AudioService:
             # 오디오 설정
             audio_config = texttospeech.AudioConfig(
                 audio_encoding=texttospeech.AudioEncoding.MP3,
-                speaking_rate=0.9,  # 약간 느리게 (면접관의 차분한 태도)
+                speaking_rate=self.SPEAKING_RATE,
                 pitch=0.0
             )
             
-            # TTS 요청
-            response = self.tts_client.synthesize_speech(
+            # TTS 요청 (동기 gRPC 호출은 스레드에서 실행 - 합성 중에도 이벤트 루프 유지)
+            response = await asyncio.to_thread(
+                self.tts_client.synthesize_speech,
                 input=synthesis_input,
                 voice=voice,
                 audio_config=audio_config
             )
             
-            # 임시 파일로 저장
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".mp3") as temp_file:
-                temp_file.write(response.audio_content)
-                temp_file_path = temp_file.name
-            
-            logger.info(f"TTS audio saved to temporary file: {temp_file_path}")
-            
-            # S3에 업로드
-            from app.services.s3_service import s3_service
-            
-            file_key = f"interview_audio/{os.path.basename(temp_file_path)}.mp3"
-            
-            # 파일을 S3에 업로드
-            with open(temp_file_path, "rb") as f:
-                audio_url = await s3_service.upload_audio_file(
-                    file_path=temp_file_path,
-                    key=file_key
-                )
-            
-            # 임시 파일 삭제
-            os.unlink(temp_file_path)
-            
+            # S3에 업로드 (임시 파일 없이 메모리에서 바로 업로드)
+            audio_url = await s3_service.upload_audio_bytes(
+                data=response.audio_content,
+                key=file_key
+            )
+
             logger.info(f"TTS audio uploaded to S3: {audio_url}")
             return audio_url
             
@@ -1,7 +1,11 @@
+import io
+import asyncio
 import boto3
+from botocore.config import Config
 from botocore.exceptions import ClientError
 from config import settings
 import logging
+from typing import Optional
 
 logger = logging.getLogger(__name__)
 
@@ -9,77 +13,108 @@ logger = logging.getLogger(__name__)
 class S3Service:
     def __init__(self):
         # S3 Client 설정 (AWS S3 또는 S3 Compatible API)
+        # 커넥션 풀/keepalive로 요청마다 TLS 핸드셰이크를 반복하지 않음
         client_config = {
             'aws_access_key_id': settings.aws_access_key_id,
             'aws_secret_access_key': settings.aws_secret_access_key,
-            'region_name': settings.aws_region
+            'region_name': settings.aws_region,
+            'config': Config(
+                max_pool_connections=32,
+                tcp_keepalive=True,
+                retries={'max_attempts': 3, 'mode': 'adaptive'}
+            )
         }
 
         # S3 Compatible API endpoint 설정 (Oracle Object Storage, MinIO 등)
         if settings.aws_s3_endpoint:
-            from botocore.config import Config
-            config = Config()
             client_config['endpoint_url'] = settings.aws_s3_endpoint
-            client_config['config'] = config
 
         self.s3_client = boto3.client('s3', **client_config)
         self.bucket_name = settings.aws_s3_bucket
 
-    def get_file_stream(self, s3_key: str):
+    def download_to_buffer(self, s3_key: str) -> Optional[io.BytesIO]:
         """
-        S3에서 파일을 스트림으로 가져옵니다.
+        S3 파일을 메모리 버퍼로 다운로드합니다.
+
+        Transfer Manager(download_fileobj)가 큰 파일을 범위 요청으로 나눠 병렬 다운로드하며,
+        버퍼에 직접 기록하므로 bytes 중간 복사본이 생기지 않습니다.
 
         Args:
             s3_key: S3 객체 키
 
         Returns:
-            파일 스트림 객체
+            처음 위치로 되돌린 BytesIO (실패 시 None)
+        """
+        try:
+            buffer = io.BytesIO()
+            self.s3_client.download_fileobj(self.bucket_name, s3_key, buffer)
+            buffer.seek(0)
+            return buffer
+        except ClientError as e:
+            logger.error(f"Failed to download file from S3: {e}")
+            return None
+
+    async def get_presigned_url_if_exists(self, key: str) -> Optional[str]:
+        """
+        S3 객체가 존재하면 Presigned URL 반환 (캐시 조회용)
+
+        Args:
+            key: S3 객체 키
+
+        Returns:
+            Presigned URL (유효 기간: 1시간), 객체가 없으면 None
         """
         try:
-            response = self.s3_client.get_object(Bucket=self.bucket_name, Key=s3_key)
-            return response['Body']
+            await asyncio.to_thread(self.s3_client.head_object, Bucket=self.bucket_name, Key=key)
         except ClientError as e:
-            logger.error(f"Failed to get file stream from S3: {e}")
+            if e.response.get('Error', {}).get('Code') not in ('404', 'NoSuchKey', 'NotFound'):
+                logger.warning(f"Failed to check S3 object {key}: {e}")
             return None
-    
-    async def upload_audio_file(
+
+        return self.s3_client.generate_presigned_url(
+            'get_object',
+            Params={'Bucket': self.bucket_name, 'Key': key},
+            ExpiresIn=3600  # 1시간
+        )
+
+    async def upload_audio_bytes(
         self,
-        file_path: str,
+        data: bytes,
         key: str
     ) -> str:
         """
-        오디오 파일을 S3에 업로드하고 Presigned URL 반환
-        
+        메모리의 오디오 바이트를 S3에 업로드하고 Presigned URL 반환
+
         Args:
-            file_path: 로컬 파일 경로
+            data: 오디오 바이트 (MP3)
             key: S3 객체 키
-            
+
         Returns:
             Presigned URL (유효 기간: 1시간)
         """
         try:
-            # S3에 업로드
-            with open(file_path, 'rb') as f:
-                self.s3_client.upload_fileobj(
-                    f,
-                    self.bucket_name,
-                    key,
-                    ExtraArgs={'ContentType': 'audio/mpeg'}
-                )
-            
-            logger.info(f"Audio file uploaded to S3: {key}")
-            
+            # 임시 파일 없이 바로 업로드 (블로킹 호출은 스레드에서 실행)
+            await asyncio.to_thread(
+                self.s3_client.put_object,
+                Bucket=self.bucket_name,
+                Key=key,
+                Body=data,
+                ContentType='audio/mpeg'
+            )
+
+            logger.info(f"Audio bytes uploaded to S3: {key}")
+
             # Presigned URL 생성 (1시간 유효)
             url = self.s3_client.generate_presigned_url(
                 'get_object',
                 Params={'Bucket': self.bucket_name, 'Key': key},
                 ExpiresIn=3600  # 1시간
             )
-            
+
             return url
-            
+
         except Exception as e:
-            logger.error(f"Failed to upload audio file to S3: {e}")
+            logger.error(f"Failed to upload audio bytes to S3: {e}")
             raise
 
 
@@ -1,18 +1,79 @@
 """PDF 벡터화 서비스 - Gemini 기반 카테고리별 청킹 & Embedding"""
 import logging
 import io
-import json
+import orjson
 import fitz  # PyMuPDF
 import asyncio
-from typing import List, Dict, Tuple
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import List, Dict, Tuple, Optional
 from pydantic import BaseModel
+from google.genai import types
 from app.models import RecordChunk
+from app.database import get_db
 from sqlalchemy.orm import Session
-from sqlalchemy import text
+from sqlalchemy import text, insert
+from app.vector_tuning import DEFAULT_EF_SEARCH
+from config import settings
+from app.core.genai_client import get_genai_client, gemini_rate_limiter, get_retry_delay, is_rate_limited
 
 logger = logging.getLogger(__name__)
 
 
+# PDF 배치 파싱 프롬프트 (모든 배치에서 동일)
+PDF_PARSE_PROMPT = """당신은 학교 생활기록부 전문 분석가입니다.
+
+PDF 파일은 학생의 생활기록부입니다. 각 페이지의 내용을 분석하여 청킹하고 JSON 형식으로 변환해주세요.
+
+## 청킹 규칙 (중요)
+
+1. **개인정보 완전 삭제**: 이름 → [이름], 번호 → [번호], 주소 → [주소]
+2. **카테고리 분류**: 성적, 세특, 창체, 행특, 기타 중 하나
+3. **청크 크기**: 하나의 content는 400~600자 이내로 구성
+4. **카테고리별 통합**: 같은 카테고리의 활동들은 **하나의 content에 모두 묶어서 작성**하세요. 각 활동은 " | "로 구분합니다.
+   - 예: "활동1 내용 | 활동2 내용 | 활동3 내용"
+5. **청크 분리 기준**:
+   - 같은 카테고리 내에서 600자를 넘어가도 좋으니 그 내용을 끝까지 출력하고 다음 청크로 넘어가세요. (...으로 내용 끊기 금지)
+6. **단순 텍스트 변환**: 표 형식의 데이터(수상경력, 성적 등)는 간단한 문장 형식으로 변환하세요.
+ - 예: 2학년 진로사항/프로그래머/ 스마트시티에 관심이 있었으며 ~, 3학년 진로사항/ 정보통신분야 / AI에도 관심이 있고 임베디드에도~ 
+7. **공백 최소화**: 불필요한 줄바꿈, 공백 제거
+8. 내용을 간소화하려고 하거나 요약하지 마세요. 있는 그대로 작성하세요.
+
+## 🚨 중요: 반복 절대 금지
+
+- **같은 문장 반복 금지**: 같은 내용을 반복해서 작성하지 마세요.
+
+## 출력 형식
+
+반드시 아래 JSON 형식으로만 출력하세요:
+
+```json
+{
+  "records": [
+    {
+      "category": "창체",
+      "content": "재난안전교육 참여 | 교내체육행사 농구, 2인3각, 줄다리기 참여 | 학교폭력예방교육 이수 및 캠페인 활동 | 독도 교육 및 SNS 캠페인 참여 | 수학여행 제주도 체험 및 4.3평화공원 관람"
+    },
+    {
+      "category": "세특",
+      "content": "English Conversation 역할극 활동 | 알고리즘 연구반 문제 해결 및 프로그램 작성"
+    }
+  ]
+}
+```
+
+## 절대 금지 사항
+
+- **활동별로 따로따로 청크 만들지 마세요**: 같은 카테고리는 반드시 하나에 묶어주세요
+- **불필요한 형식 제거**: 마크다운 표, 여러 줄바꿈 제거
+- **내용을 요약/추가하지 마세요**: PDF에 있는 텍스트만 있는 그대로 추출하세요
+- **같은 내용 반복 금지**: 같은 문장이나 단락을 2번 이상 반복하지 마세요
+- **JSON 외의 텍스트 출력 금지**: 설명이나 분석 없이 JSON만 반환하세요"""
+
+
 class RecordData(BaseModel):
     """생활기록부 청크 데이터 모델"""
     category: str
@@ -24,22 +85,92 @@ class RecordsResponse(BaseModel):
     records: List[RecordData]
 
 
+def _strip_schema_metadata(schema):
+    """
+    JSON 스키마에서 title/description 메타데이터를 재귀적으로 제거
+
+    properties/$defs의 키는 필드·모델 이름이므로 그대로 두고 값(하위 스키마)만 정리합니다.
+    """
+    if isinstance(schema, list):
+        return [_strip_schema_metadata(item) for item in schema]
+    if not isinstance(schema, dict):
+        return schema
+
+    stripped = {}
+    for key, value in schema.items():
+        if key in ("title", "description"):
+            continue
+        if key in ("properties", "$defs") and isinstance(value, dict):
+            stripped[key] = {name: _strip_schema_metadata(sub) for name, sub in value.items()}
+        else:
+            stripped[key] = _strip_schema_metadata(value)
+    return stripped
+
+
+# Gemini 응답 스키마 (정적이므로 배치마다 재생성하지 않음)
+# 모델/필드명에서 자동 생성된 title과 docstring description은 출력에 영향이 없어 제거 (요청 페이로드 축소)
+RECORDS_RESPONSE_SCHEMA = _strip_schema_metadata(RecordsResponse.model_json_schema())
+
+
+# PyMuPDF는 스레드 안전하지 않으므로 동시 벡터화 요청 간 PDF 분할을 직렬화
+_pdf_lock = threading.Lock()
+
+
+def _split_pdf_batches(pdf_data: bytes, batch_size: int) -> List[Tuple[List[int], bytes]]:
+    """
+    원본 PDF를 한 번만 열어 batch_size 페이지씩 서브 PDF로 분할 (asyncio.to_thread 워커 스레드에서 실행)
+
+    페이지 래스터화 없이 원본 페이지 객체를 그대로 복사하므로 이미지 변환보다 빠르고 작습니다.
+
+    Args:
+        pdf_data: PDF 파일 바이트
+        batch_size: 배치당 페이지 수
+
+    Returns:
+        [(페이지 번호 리스트 (0-based), 서브 PDF 바이트), ...]
+    """
+    with _pdf_lock:
+        src = fitz.open(stream=pdf_data, filetype="pdf")
+        try:
+            batches = []
+            for start_page in range(0, len(src), batch_size):
+                end_page = min(start_page + batch_size, len(src))
+                sub = fitz.open()
+                try:
+                    sub.insert_pdf(src, from_page=start_page, to_page=end_page - 1)
+                    batches.append((list(range(start_page, end_page)), sub.tobytes(garbage=0, deflate=False)))
+                finally:
+                    sub.close()
+            return batches
+        finally:
+            src.close()
+            # 앱 프로세스가 계속 살아 있으므로 MuPDF 리소스 캐시(store)를 비워 RSS가 누적되지 않게 함
+            fitz.TOOLS.store_shrink(100)
+
+
 class VectorService:
     """PDF 벡터화 서비스 - Gemini 기반 카테고리별 청킹 & Embedding"""
 
+    # 임베딩 요청당 텍스트 수 / 동시 임베딩 요청 수
+    EMBED_BATCH_SIZE = 100  # embed_content 요청당 최대 텍스트 수
+    EMBED_CONCURRENCY = 8
+    EMBED_CACHE_SIZE = 10_000  # 프로세스 내 임베딩 LRU 캐시 최대 항목 수
+    RATE_LIMIT_RETRIES = 3  # 429 응답 시 재시도 횟수
+    COPY_MIN_ROWS = 50  # 이 행 수 이상이면 executemany INSERT 대신 COPY로 저장
+
     def __init__(self):
         # google.genai 클라이언트 초기화
-        from google import genai
-        from google.genai import types
-        from config import settings
-
-        self.client = genai.Client(
-            api_key=settings.google_api_key
-        )
+        self.client = get_genai_client()
         self.types = types
-        self.genai = genai
         self.embedding_model = 'gemini-embedding-001'  # 768차원 embedding 모델
         self.chat_model = 'gemini-2.5-flash'  # 청킹용 모델
+        self.gemini_concurrency = settings.gemini_concurrency
+        # 임베딩 LRU 캐시 (SHA-256(모델 + 텍스트) → 벡터)
+        # _embed_text_sync가 별도 스레드에서 호출하므로 락으로 보호
+        self._embedding_cache: "OrderedDict[bytes, List[float]]" = OrderedDict()
+        self._embedding_cache_lock = threading.Lock()
+        # 배치마다 동일한 프롬프트는 Part로 한 번만 생성해 재사용
+        self._parse_prompt_part = types.Part.from_text(text=PDF_PARSE_PROMPT)
     
     async def vectorize_pdf(
         self,
@@ -64,118 +195,111 @@ class VectorService:
         try:
             logger.info(f"Starting PDF vectorization for record {record_id}")
 
-            # PDF 전체를 fitz로 열어 페이지 수 확인
-            import fitz
-            doc = fitz.open(stream=pdf_bytes.read(), filetype="pdf")
-            total_pages = len(doc)
-            doc.close()
-            pdf_bytes.seek(0)  # 다시 처음으로
-
+            # PDF를 한 번만 열어 4페이지씩 서브 PDF로 분할 (워커 스레드 - 이벤트 루프 블로킹 방지)
             batch_size = 4  # 4페이지씩 배치
-            total_batches = (total_pages + batch_size - 1) // batch_size
+            pdf_batches = await asyncio.to_thread(
+                _split_pdf_batches, pdf_bytes.getvalue(), batch_size
+            )
+            total_batches = len(pdf_batches)
+            total_pages = sum(len(pages) for pages, _ in pdf_batches)
 
             logger.info(f"📄 {total_pages} pages → {total_batches} batches ({batch_size} pages/batch)")
             
             if progress_callback:
                 await progress_callback(10)
 
-            # 2. 모든 배치를 동시에 처리 (병렬 처리) ⚡
-            all_chunks = []
+            # 2. 배치별 파싱 → 임베딩 파이프라인 (병렬 처리) ⚡
+            # 파싱이 끝난 배치는 다른 배치의 파싱을 기다리지 않고 바로 임베딩을 시작
             failed_batches = []
 
-            logger.info("🤖 AI Chunking (Parallel Processing)...")
+            logger.info("🤖 AI Chunking + Embedding (Pipelined)...")
 
-            # 모든 배치 태스크 생성
-            tasks = []
-            for i in range(total_batches):
-                start_page = i * batch_size
-                end_page = min(start_page + batch_size, total_pages)
-                pages_in_batch = list(range(start_page, end_page))
-                tasks.append(self._parse_pdf_batch_with_gemini(
-                    pdf_bytes, pages_in_batch, i, total_batches
-                ))
+            # 동시 Gemini 요청 수 제한 (파싱: 프로젝트 QPS 한도 보호 / 임베딩: 배치 요청 동시성)
+            parse_semaphore = asyncio.Semaphore(self.gemini_concurrency)
+            embed_semaphore = asyncio.Semaphore(self.EMBED_CONCURRENCY)
+            completed_batches = 0
+            last_progress = 10
 
-            # 동시 실행 (병렬 처리)
-            results = await asyncio.gather(*tasks, return_exceptions=True)
+            async def process_batch(
+                pages_in_batch: List[int], batch_pdf: bytes, batch_idx: int
+            ) -> List[Tuple[Dict, Optional[List[float]]]]:
+                nonlocal completed_batches, last_progress
+                try:
+                    async with parse_semaphore:
+                        chunks = await self._parse_pdf_batch_with_gemini(
+                            batch_pdf, pages_in_batch, batch_idx, total_batches
+                        )
+
+                    embeddings = await self._embed_chunk_texts(
+                        [chunk['text'] for chunk in chunks], embed_semaphore
+                    )
+                    return list(zip(chunks, embeddings))
+                finally:
+                    # 진행률 업데이트 (10-90%, 완료 순서대로 - 정수 퍼센트가 바뀔 때만 전송)
+                    completed_batches += 1
+                    progress = 10 + int((completed_batches / total_batches) * 80)
+                    if progress_callback and progress != last_progress:
+                        last_progress = progress
+                        await progress_callback(progress)
+
+            # 동시 실행 (gather는 입력 순서대로 결과를 반환하므로 페이지 순서 유지)
+            results = await asyncio.gather(
+                *(
+                    process_batch(pages_in_batch, batch_pdf, i)
+                    for i, (pages_in_batch, batch_pdf) in enumerate(pdf_batches)
+                ),
+                return_exceptions=True
+            )
 
             # 결과 집계
+            embedded_chunks = []
             for i, result in enumerate(results):
                 if isinstance(result, Exception):
                     logger.warning(f"⚠️  [{i+1}/{total_batches}] Failed: {str(result)[:80]}... - Skipping")
                     failed_batches.append(i + 1)
                 elif result:
-                    all_chunks.extend(result)
-                    start_page = i * batch_size
-                    end_page = min(start_page + batch_size, total_pages)
-                    logger.info(f"📦 [{i+1}/{total_batches}] {len(result)} chunks (pages {start_page+1}-{end_page})")
+                    embedded_chunks.extend(result)
+                    pages_in_batch = pdf_batches[i][0]
+                    logger.info(f"📦 [{i+1}/{total_batches}] {len(result)} chunks (pages {pages_in_batch[0]+1}-{pages_in_batch[-1]+1})")
                 else:
                     logger.warning(f"⚠️  [{i+1}/{total_batches}] No chunks")
                     failed_batches.append(i + 1)
 
-            # 진행률 업데이트
-            if progress_callback:
-                await progress_callback(70)
-
             # 실패한 배치가 있어도 계속 진행 (부분 성공 허용)
             if failed_batches:
-                logger.warning(f"⚠️ Some batches failed: {failed_batches} - but continuing with {len(all_chunks)} chunks")
+                logger.warning(f"⚠️ Some batches failed: {failed_batches} - but continuing with {len(embedded_chunks)} chunks")
 
-            if not all_chunks:
+            if not embedded_chunks:
                 logger.error("No chunks generated from any batch")
                 return False, "Failed to generate chunks from all batches", 0
 
-            # 3. 배치 임베딩 & 벌크 DB 삽입 🔥
-            if progress_callback:
-                await progress_callback(75)
-
-            logger.info(f"🔄 Batch Embedding {len(all_chunks)} chunks...")
+            failed_embeddings = sum(1 for _, emb in embedded_chunks if emb is None)
 
-            # 배치 임베딩 (20개씩)
-            batch_size = 20
-            all_embeddings = []
-            failed_embeddings = 0
+            # 3. 벌크 DB 삽입 (한 번에 저장) 🚀
+            if progress_callback and last_progress != 90:
+                await progress_callback(90)
 
-            for i in range(0, len(all_chunks), batch_size):
-                batch = all_chunks[i:i+batch_size]
-                texts = [chunk['text'] for chunk in batch]
-                
-                try:
-                    embeddings = await self._embed_batch(texts)
-                    all_embeddings.extend(embeddings)
-                    
-                    # 진행률 업데이트 (75-90%)
-                    if progress_callback:
-                        embed_progress = 75 + int(((i + batch_size) / len(all_chunks)) * 15)
-                        await progress_callback(min(embed_progress, 90))
-                        
-                except Exception as e:
-                    logger.warning(f"⚠️  Batch {i//batch_size + 1} embedding failed: {str(e)[:50]}")
-                    # 실패한 배치는 개별 임베딩으로 시도
-                    for chunk in batch:
-                        try:
-                            emb = await self._embed_text(chunk['text'])
-                            all_embeddings.append(emb)
-                        except Exception as e2:
-                            logger.debug(f"   ❌ Individual chunk failed: {str(e2)[:50]}")
-                            all_embeddings.append(None)  # 실패 표시
-                            failed_embeddings += 1
-
-            # 4. 벌크 DB 삽입 (한 번에 저장) 🚀
             logger.info("💾 Bulk inserting to database...")
             
-            bulk_data = []
-            for idx, chunk_data in enumerate(all_chunks):
-                if idx < len(all_embeddings) and all_embeddings[idx] is not None:
-                    bulk_data.append({
-                        'record_id': record_id,
-                        'chunk_text': chunk_data['text'],
-                        'chunk_index': chunk_data['index'],
-                        'category': chunk_data['category'],
-                        'embedding': all_embeddings[idx]
-                    })
+            bulk_data = [
+                {
+                    'record_id': record_id,
+                    'chunk_text': chunk_data['text'],
+                    'chunk_index': chunk_data['index'],
+                    'category': chunk_data['category'],
+                    'embedding': embedding
+                }
+                for chunk_data, embedding in embedded_chunks
+                if embedding is not None
+            ]
             
-            if bulk_data:
-                db.bulk_insert_mappings(RecordChunk, bulk_data)
+            if len(bulk_data) >= self.COPY_MIN_ROWS:
+                # 대량 청크는 COPY FROM STDIN으로 저장 (파라미터 바인딩/SQL 파싱 없음)
+                self._copy_chunks(db, bulk_data)
+                db.commit()
+            elif bulk_data:
+                # 단일 executemany INSERT로 한 번에 저장 (RETURNING 없음)
+                db.execute(insert(RecordChunk), bulk_data)
                 db.commit()
 
             saved_count = len(bulk_data)
@@ -208,9 +332,34 @@ class VectorService:
             db.rollback()
             return False, f"Vectorization error: {str(e)}", 0
     
+    def _copy_chunks(self, db: Session, rows: List[Dict]) -> None:
+        """
+        record_chunks에 COPY FROM STDIN으로 청크 저장 (psycopg 3 copy API)
+
+        세션의 현재 트랜잭션 커넥션을 그대로 사용하므로 커밋은 호출부에서 처리합니다.
+        embedding은 pgvector 텍스트 형식('[0.1, 0.2, ...]')으로 전달합니다.
+
+        Args:
+            db: 데이터베이스 세션
+            rows: record_id, chunk_index, category, chunk_text, embedding 키를 가진 행 리스트
+        """
+        raw_conn = db.connection().connection.driver_connection
+        with raw_conn.cursor() as cur:
+            with cur.copy(
+                "COPY record_chunks (record_id, chunk_index, category, chunk_text, embedding) FROM STDIN"
+            ) as copy:
+                for row in rows:
+                    copy.write_row((
+                        row['record_id'],
+                        row['chunk_index'],
+                        row['category'],
+                        row['chunk_text'],
+                        str(row['embedding']),
+                    ))
+
     async def _parse_pdf_batch_with_gemini(
         self,
-        pdf_bytes: io.BytesIO,
+        batch_pdf: bytes,
         page_numbers: List[int],
         batch_index: int,
         total_batches: int
@@ -219,98 +368,28 @@ class VectorService:
         Gemini 2.5 Flash로 PDF 페이지 배치를 파싱
         
         Args:
-            pdf_bytes: PDF 파일 바이트
-            page_numbers: 처리할 페이지 번호 리스트 (0-based)
+            batch_pdf: 배치 페이지만 담은 서브 PDF 바이트
+            page_numbers: 처리할 페이지 번호 리스트 (0-based, 로그용)
             batch_index: 배치 인덱스
             total_batches: 전체 배치 수
             
         Returns:
             청크 리스트
         """
-        import json
-        import fitz  # PyMuPDF
-        
-        prompt = """당신은 학교 생활기록부 전문 분석가입니다.
-
-PDF 파일은 학생의 생활기록부입니다. 각 페이지의 내용을 분석하여 청킹하고 JSON 형식으로 변환해주세요.
-
-## 청킹 규칙 (중요)
-
-1. **개인정보 완전 삭제**: 이름 → [이름], 번호 → [번호], 주소 → [주소]
-2. **카테고리 분류**: 성적, 세특, 창체, 행특, 기타 중 하나
-3. **청크 크기**: 하나의 content는 400~600자 이내로 구성
-4. **카테고리별 통합**: 같은 카테고리의 활동들은 **하나의 content에 모두 묶어서 작성**하세요. 각 활동은 " | "로 구분합니다.
-   - 예: "활동1 내용 | 활동2 내용 | 활동3 내용"
-5. **청크 분리 기준**:
-   - 같은 카테고리 내에서 600자를 넘어가도 좋으니 그 내용을 끝까지 출력하고 다음 청크로 넘어가세요. (...으로 내용 끊기 금지)
-6. **단순 텍스트 변환**: 표 형식의 데이터(수상경력, 성적 등)는 간단한 문장 형식으로 변환하세요.
- - 예: 2학년 진로사항/프로그래머/ 스마트시티에 관심이 있었으며 ~, 3학년 진로사항/ 정보통신분야 / AI에도 관심이 있고 임베디드에도~ 
-7. **공백 최소화**: 불필요한 줄바꿈, 공백 제거
-8. 내용을 간소화하려고 하거나 요약하지 마세요. 있는 그대로 작성하세요.
-
-## 🚨 중요: 반복 절대 금지
-
-- **같은 문장 반복 금지**: 같은 내용을 반복해서 작성하지 마세요.
-
-## 출력 형식
-
-반드시 아래 JSON 형식으로만 출력하세요:
-
-```json
-{
-  "records": [
-    {
-      "category": "창체",
-      "content": "재난안전교육 참여 | 교내체육행사 농구, 2인3각, 줄다리기 참여 | 학교폭력예방교육 이수 및 캠페인 활동 | 독도 교육 및 SNS 캠페인 참여 | 수학여행 제주도 체험 및 4.3평화공원 관람"
-    },
-    {
-      "category": "세특",
-      "content": "English Conversation 역할극 활동 | 알고리즘 연구반 문제 해결 및 프로그램 작성"
-    }
-  ]
-}
-```
-
-## 절대 금지 사항
-
-- **활동별로 따로따로 청크 만들지 마세요**: 같은 카테고리는 반드시 하나에 묶어주세요
-- **불필요한 형식 제거**: 마크다운 표, 여러 줄바꿈 제거
-- **내용을 요약/추가하지 마세요**: PDF에 있는 텍스트만 있는 그대로 추출하세요
-- **같은 내용 반복 금지**: 같은 문장이나 단락을 2번 이상 반복하지 마세요
-- **JSON 외의 텍스트 출력 금지**: 설명이나 분석 없이 JSON만 반환하세요"""
-        
         try:
-            # PDF에서 해당 페이지 추출
-            pdf_bytes.seek(0)
-            doc = fitz.open(stream=pdf_bytes.read(), filetype="pdf")
-
-            # 각 페이지를 이미지로 변환
-            image_parts = []
-            for page_num in page_numbers:
-                page = doc[page_num]
-                # 페이지를 중간 해상도 이미지로 변환 (속도와 품질 밸런스)
-                pix = page.get_pixmap(dpi=150)
-                img_bytes = pix.tobytes("png")
-
-                # genai.Part로 변환
-                image_parts.append(self.types.Part.from_bytes(
-                    data=img_bytes,
-                    mime_type="image/png"
-                ))
-
-            doc.close()
+            # 배치 전체를 하나의 PDF Part로 전달 (페이지별 이미지 Part 대신)
+            pdf_part = self.types.Part.from_bytes(data=batch_pdf, mime_type="application/pdf")
 
             # Gemini 2.5 Flash에 비동기 요청 전송 (JSON 형식 응답 강제)
             logger.info(f"🚀 [{batch_index+1}/{total_batches}] Sending request for pages {page_numbers}...")
-            import time
             start_time = time.time()
 
-            response = await self.client.aio.models.generate_content(
+            response = await self._generate_with_backoff(
                 model=self.chat_model,
-                contents=[prompt] + image_parts,
+                contents=[self._parse_prompt_part, pdf_part],
                 config={
                     "response_mime_type": "application/json",
-                    "response_json_schema": RecordsResponse.model_json_schema(),
+                    "response_json_schema": RECORDS_RESPONSE_SCHEMA,
                 }
             )
 
@@ -320,7 +399,7 @@ PDF 파일은 학생의 생활기록부입니다. 각 페이지의 내용을 분
             # 응답 텍스트 추출 및 JSON 파싱
             response_text = response.text
             
-            result = json.loads(response_text)
+            result = orjson.loads(response_text)
             records = result.get('records', [])
             
             # RecordChunk 형식으로 변환
@@ -334,7 +413,7 @@ PDF 파일은 학생의 생활기록부입니다. 각 페이지의 내용을 분
             
             return chunks
             
-        except json.JSONDecodeError as e:
+        except orjson.JSONDecodeError as e:
             logger.warning(f"⚠️  JSON parsing failed: {str(e)[:50]}")
             raise
 
@@ -342,17 +421,124 @@ PDF 파일은 학생의 생활기록부입니다. 각 페이지의 내용을 분
             logger.warning(f"⚠️  Gemini error: {str(e)}")
             raise
 
+    async def _embed_chunk_texts(
+        self,
+        texts: List[str],
+        semaphore: asyncio.Semaphore
+    ) -> List[Optional[List[float]]]:
+        """
+        청크 텍스트 임베딩 (EMBED_BATCH_SIZE개씩 배치 요청, 세마포어로 동시 요청 수 제한)
+
+        배치 요청이 실패하면 해당 배치의 청크를 개별 임베딩으로 동시에 재시도합니다.
+        중복 텍스트는 한 번만 요청하고 결과를 입력 위치에 다시 펼칩니다.
+
+        Args:
+            texts: 임베딩할 텍스트 리스트
+            semaphore: 동시 임베딩 요청 수 제한용 세마포어 (배치 간 공유)
+
+        Returns:
+            입력 순서대로 임베딩 리스트 (실패한 청크는 None)
+        """
+        async def embed_one_batch(batch: List[str]) -> List[Optional[List[float]]]:
+            async with semaphore:
+                try:
+                    return await self._embed_batch(batch)
+                except Exception as e:
+                    logger.warning(f"⚠️  Batch embedding failed: {str(e)[:50]}")
+                    # 실패한 배치는 개별 임베딩으로 동시에 시도 (실패한 청크는 None)
+                    results = await asyncio.gather(
+                        *(self._embed_text(chunk_text) for chunk_text in batch),
+                        return_exceptions=True
+                    )
+                    embeddings = []
+                    for result in results:
+                        if isinstance(result, Exception):
+                            logger.debug(f"   ❌ Individual chunk failed: {str(result)[:50]}")
+                            embeddings.append(None)
+                        else:
+                            embeddings.append(result)
+                    return embeddings
+
+        # 동일한 텍스트는 한 번만 임베딩 (dict는 삽입 순서 유지)
+        unique_texts = list(dict.fromkeys(texts))
+
+        batch_size = self.EMBED_BATCH_SIZE
+        batch_results = await asyncio.gather(
+            *(embed_one_batch(unique_texts[i:i+batch_size]) for i in range(0, len(unique_texts), batch_size))
+        )
+        embedding_by_text = dict(zip(
+            unique_texts, (emb for embeddings in batch_results for emb in embeddings)
+        ))
+        return [embedding_by_text[t] for t in texts]
+
+    async def _generate_with_backoff(self, **kwargs):
+        """
+        요청률 제한기를 거쳐 generate_content 호출 (429 시 Retry-After/지수 백오프 후 재시도)
+        """
+        for attempt in range(self.RATE_LIMIT_RETRIES + 1):
+            await gemini_rate_limiter.acquire()
+            try:
+                return await self.client.aio.models.generate_content(**kwargs)
+            except Exception as e:
+                if not is_rate_limited(e) or attempt == self.RATE_LIMIT_RETRIES:
+                    raise
+                delay = get_retry_delay(attempt, e)
+                logger.warning(f"⏳ Gemini rate limited, retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+    async def _embed_with_backoff(self, contents):
+        """
+        요청률 제한기를 거쳐 embed_content 호출 (429 시 Retry-After/지수 백오프 후 재시도)
+        """
+        for attempt in range(self.RATE_LIMIT_RETRIES + 1):
+            await gemini_rate_limiter.acquire()
+            try:
+                return await self.client.aio.models.embed_content(
+                    model=self.embedding_model,
+                    contents=contents,
+                    config=self.types.EmbedContentConfig(
+                        output_dimensionality=768
+                    )
+                )
+            except Exception as e:
+                if not is_rate_limited(e) or attempt == self.RATE_LIMIT_RETRIES:
+                    raise
+                delay = get_retry_delay(attempt, e)
+                logger.warning(f"⏳ Embedding rate limited, retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+    def _embedding_cache_key(self, text: str) -> bytes:
+        """임베딩 캐시 키 (모델별로 분리되도록 모델명을 포함한 SHA-256)"""
+        return hashlib.sha256(f"{self.embedding_model}\0{text}".encode("utf-8")).digest()
+
+    def _get_cached_embedding(self, key: bytes) -> Optional[List[float]]:
+        """캐시된 임베딩 조회 (적중 시 최근 사용으로 갱신)"""
+        with self._embedding_cache_lock:
+            embedding = self._embedding_cache.get(key)
+            if embedding is not None:
+                self._embedding_cache.move_to_end(key)
+            return embedding
+
+    def _put_cached_embedding(self, key: bytes, embedding: List[float]) -> None:
+        """임베딩 캐시 저장 (최대 크기 초과 시 가장 오래된 항목 제거)"""
+        with self._embedding_cache_lock:
+            self._embedding_cache[key] = embedding
+            self._embedding_cache.move_to_end(key)
+            if len(self._embedding_cache) > self.EMBED_CACHE_SIZE:
+                self._embedding_cache.popitem(last=False)
+
     async def _embed_text(self, text: str) -> List[float]:
         """텍스트를 벡터로 임베딩 (768차원) - 개별 텍스트용"""
+        cache_key = self._embedding_cache_key(text)
+        cached = self._get_cached_embedding(cache_key)
+        if cached is not None:
+            return cached
+
         try:
-            result = await self.client.aio.models.embed_content(
-                model=self.embedding_model,
-                contents=text,
-                config=self.types.EmbedContentConfig(
-                    output_dimensionality=768
-                )
-            )
-            return result.embeddings[0].values
+            result = await self._embed_with_backoff(text)
+            embedding = result.embeddings[0].values
+            self._put_cached_embedding(cache_key, embedding)
+            return embedding
         except Exception as e:
             logger.error(f"Embedding failed: {e}")
             raise
@@ -361,41 +547,37 @@ PDF 파일은 학생의 생활기록부입니다. 각 페이지의 내용을 분
         """여러 텍스트를 한 번에 배치 임베딩 (768차원) 🔥
 
         Google Embedding API는 배치 처리를 지원하여 최대 100개까지 동시에 처리 가능
+        캐시에 있는 텍스트는 제외하고 나머지만 요청합니다.
         """
         try:
-            import time
             start_time = time.time()
 
-            result = await self.client.aio.models.embed_content(
-                model=self.embedding_model,
-                contents=texts,  # 리스트 전달
-                config=self.types.EmbedContentConfig(
-                    output_dimensionality=768
-                )
-            )
+            cache_keys = [self._embedding_cache_key(t) for t in texts]
+            embeddings = [self._get_cached_embedding(key) for key in cache_keys]
+            miss_indices = [i for i, emb in enumerate(embeddings) if emb is None]
+
+            if miss_indices:
+                result = await self._embed_with_backoff([texts[i] for i in miss_indices])  # 리스트 전달
+
+                for i, emb in zip(miss_indices, result.embeddings):
+                    embeddings[i] = emb.values
+                    self._put_cached_embedding(cache_keys[i], emb.values)
 
             elapsed = time.time() - start_time
-            logger.debug(f"📊 Embedded {len(texts)} chunks in {elapsed:.2f}s")
+            logger.debug(f"📊 Embedded {len(texts)} chunks in {elapsed:.2f}s ({len(texts) - len(miss_indices)} cached)")
 
-            return [emb.values for emb in result.embeddings]
-        except Exception as e:
-            logger.warning(f"Batch embedding failed: {e}, falling back to individual")
-            # 배치 실패 시 개별 처리로 폴백
-            embeddings = []
-            for text in texts:
-                try:
-                    emb = await self._embed_text(text)
-                    embeddings.append(emb)
-                except Exception as e2:
-                    logger.error(f"Individual embedding failed: {e2}")
-                    raise
             return embeddings
+        except Exception as e:
+            # 개별 임베딩 폴백은 호출부(vectorize_pdf)에서 청크 단위로 처리
+            logger.warning(f"Batch embedding failed: {e}")
+            raise
     
     def search_chunks_by_topic(
         self,
         record_id: int,
         topic: str,
-        db: Session = None
+        db: Session = None,
+        ef_search: Optional[int] = None
     ) -> List[int]:
         """
         주제에 따라 관련 청크를 pgvector 유사도 검색으로 찾기
@@ -404,13 +586,13 @@ PDF 파일은 학생의 생활기록부입니다. 각 페이지의 내용을 분
             record_id: 생기부 ID
             topic: 하위 주제 (출결, 성적, 동아리, 리더십, 인성/태도, 진로/자율, 독서, 봉사)
             db: 데이터베이스 세션 (외부에서 주입)
+            ef_search: 이번 검색의 hnsw.ef_search (None이면 DEFAULT_EF_SEARCH)
+                HNSW 탐색 시 유지하는 후보 힙 크기로, 클수록 recall이 오르고 느려집니다.
 
         Returns:
             관련 청크 ID 리스트 (유사도 순 상위 3개)
         """
         try:
-            from app.database import get_db
-
             # DB 세션 가져오기 (외부에서 주입받거나 새로 생성)
             if db is None:
                 db_generator = get_db()
@@ -423,17 +605,25 @@ PDF 파일은 학생의 생활기록부입니다. 각 페이지의 내용을 분
                 # 1. 주제를 embedding으로 변환 (동기 방식으로 처리)
                 query_embedding = self._embed_text_sync(topic)
 
+                # 1-1. 이번 트랜잭션의 hnsw.ef_search 설정 (SET LOCAL과 동일)
+                if ef_search is None:
+                    ef_search = DEFAULT_EF_SEARCH
+                db.execute(
+                    text("SELECT set_config('hnsw.ef_search', :ef_search, true)"),
+                    {"ef_search": str(ef_search)}
+                )
+
                 # 2. pgvector 코사인 유사도 검색 (ID만 반환)
                 # <-> 연산자: 코사인 거리 (작을수록 유사)
                 query = text("""
                     SELECT id
                     FROM record_chunks
                     WHERE record_id = :record_id
-                    ORDER BY embedding <=> cast(:embedding as vector)
+                    ORDER BY embedding <=> cast(:embedding as halfvec)
                     LIMIT 3
                 """)
 
-                # embedding을 문자열로 변환 (PostgreSQL vector 형식)
+                # embedding을 문자열로 변환 (PostgreSQL vector/halfvec 텍스트 형식)
                 embedding_str = str(query_embedding)
 
                 result = db.execute(
@@ -456,33 +646,42 @@ PDF 파일은 학생의 생활기록부입니다. 각 페이지의 내용을 분
             return []
 
     def _embed_text_sync(self, text: str) -> List[float]:
-        """텍스트를 벡터로 임베딩 (동기 버전 - 이벤트 루프 내에서도 안전하게 실행)"""
-        import threading
-        import concurrent.futures
-
-        def run_in_new_loop():
-            """별도 스레드에서 새 이벤트 루프 생성하여 실행"""
-            import asyncio
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            try:
-                return loop.run_until_complete(self._embed_text(text))
-            finally:
-                loop.close()
+        """
+        텍스트를 벡터로 임베딩 (동기 버전 - 워커 스레드의 동기 그래프에서 호출)
 
-        # 이미 실행 중인 이벤트 루프가 있는지 확인
-        try:
-            import asyncio
-            asyncio.get_running_loop()
-            # 실행 중인 루프가 있으면 별도 스레드에서 실행
-            with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
-                future = executor.submit(run_in_new_loop)
-                return future.result(timeout=30)  # 30초 타임아웃
-        except RuntimeError:
-            # 실행 중인 루프가 없으면 직접 실행
-            import asyncio
-            return asyncio.run(self._embed_text(text))
+        공유 클라이언트의 비동기(aio) 커넥션은 메인 이벤트 루프에 묶여 있으므로
+        별도 이벤트 루프를 만들지 않고 동기 embed_content API를 사용합니다.
+        """
+        cache_key = self._embedding_cache_key(text)
+        cached = self._get_cached_embedding(cache_key)
+        if cached is not None:
+            return cached
+
+        for attempt in range(self.RATE_LIMIT_RETRIES + 1):
+            gemini_rate_limiter.acquire_sync()
+            try:
+                result = self.client.models.embed_content(
+                    model=self.embedding_model,
+                    contents=text,
+                    config=self.types.EmbedContentConfig(
+                        output_dimensionality=768
+                    )
+                )
+                break
+            except Exception as e:
+                if not is_rate_limited(e) or attempt == self.RATE_LIMIT_RETRIES:
+                    logger.error(f"Embedding failed: {e}")
+                    raise
+                delay = get_retry_delay(attempt, e)
+                logger.warning(f"⏳ Embedding rate limited, retrying in {delay:.1f}s")
+                time.sleep(delay)
 
+        embedding = result.embeddings[0].values
+        self._put_cached_embedding(cache_key, embedding)
+        return embedding
 
 
-vector_service = VectorService()
+@lru_cache(maxsize=1)
+def get_vector_service() -> VectorService:
+    """공유 VectorService 반환 (최초 호출 시 생성 - import 시점의 클라이언트 생성 부작용 제거)"""
+    return VectorService()
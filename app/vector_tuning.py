@@ -0,0 +1,38 @@
+"""pgvector HNSW 파라미터
+
+record_chunks.embedding HNSW 인덱스의 빌드/검색 파라미터를 한 곳에서 관리합니다.
+- 빌드 파라미터(m, ef_construction): RecordChunk 모델 선언과 앱 시작 시 인덱스 생성에서 함께 사용
+- 검색 파라미터(ef_search): 검색 트랜잭션마다 set_config로 지정
+"""
+from typing import Optional
+
+
+# HNSW 인덱스 빌드 파라미터 (모델 선언과 시작 시 마이그레이션의 단일 기준)
+HNSW_M = 24
+HNSW_EF_CONSTRUCTION = 128
+
+# 난이도 매핑이 없을 때의 검색 ef_search
+DEFAULT_EF_SEARCH = 100
+
+# 난이도별 검색 ef_search (깊이 파고드는 질문일수록 recall 우선)
+# 면접 난이도(Easy/Normal/Hard)와 질문 난이도(기본/심화/압박)를 모두 지원
+EF_SEARCH_BY_DIFFICULTY = {
+    "Easy": 40,
+    "Hard": 150,
+    "기본": 40,
+    "심화": 150,
+    "압박": 150,
+}
+
+
+def ef_search_for_difficulty(difficulty: Optional[str]) -> Optional[int]:
+    """
+    난이도에 맞는 hnsw.ef_search 반환
+
+    Args:
+        difficulty: 면접 난이도 (Easy, Normal, Hard) 또는 질문 난이도 (기본, 심화, 압박)
+
+    Returns:
+        ef_search 값 (매핑이 없으면 None - DEFAULT_EF_SEARCH 사용)
+    """
+    return EF_SEARCH_BY_DIFFICULTY.get(difficulty)
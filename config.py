@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import List, Optional
 import json
 
 
@@ -24,6 +24,16 @@ class Settings(BaseSettings):
     # Google AI (Gemini) - .env 필수
     google_api_key: str
     google_application_credentials: str = ""
+    gemini_concurrency: int = 4  # PDF 파싱 시 동시 Gemini 요청 수 (프로젝트 QPS 한도 보호)
+    gemini_requests_per_minute: int = 300  # 프로세스 전체 Gemini 요청률 상한 (토큰 버킷)
+
+    # TTS 워밍업 (앱 시작 시 백그라운드로 gRPC 채널 연결)
+    tts_warm_up_enabled: bool = True
+    tts_warm_up_timeout: float = 5.0  # 초
+
+    # HNSW 인덱스 빌드 (선택사항 - 비워두면 DB 서버 기본값 사용)
+    hnsw_build_maintenance_work_mem: str = ""  # 예: "1GB" (인스턴스 메모리에 맞게 설정)
+    hnsw_build_parallel_workers: Optional[int] = None  # max_parallel_maintenance_workers
 
     # LangGraph (선택사항)
     langchain_tracing_v2: bool = False
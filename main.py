@@ -106,10 +106,25 @@ async def startup_event():
             """))
 
             if result.fetchone() is None:
-                conn.execute(text("ALTER TABLE record_chunks ADD COLUMN embedding vector(768)"))
+                conn.execute(text("ALTER TABLE record_chunks ADD COLUMN embedding halfvec(768)"))
                 conn.commit()
                 logging.info("Added embedding column to record_chunks")
 
+            # 3-1-1. 기존 vector(768) 컬럼을 halfvec(768)로 변환 (기존 인덱스는 타입이 달라 재생성 필요)
+            result = conn.execute(text("""
+                SELECT udt_name FROM information_schema.columns
+                WHERE table_name = 'record_chunks' AND column_name = 'embedding'
+            """))
+
+            if result.scalar() == 'vector':
+                conn.execute(text("DROP INDEX IF EXISTS record_chunks_embedding_idx"))
+                conn.execute(text("""
+                    ALTER TABLE record_chunks
+                    ALTER COLUMN embedding TYPE halfvec(768) USING embedding::halfvec(768)
+                """))
+                conn.commit()
+                logging.info("Converted record_chunks.embedding to halfvec(768)")
+
             # 3-2. questions 테이블에 누락된 컬럼 확인
             missing_columns = []
             for column in [('purpose', 'VARCHAR(255)'),
@@ -141,15 +156,129 @@ async def startup_event():
                 conn.commit()
                 logging.info("Added mode column to interview_sessions")
 
-            # 3-4. HNSW 인덱스 생성
-            try:
+            # 3-3-2. interview_sessions.final_report json → jsonb 변환
+            result = conn.execute(text("""
+                SELECT data_type FROM information_schema.columns
+                WHERE table_name = 'interview_sessions' AND column_name = 'final_report'
+            """))
+
+            if result.scalar() == 'json':
                 conn.execute(text("""
+                    ALTER TABLE interview_sessions
+                    ALTER COLUMN final_report TYPE jsonb USING final_report::jsonb
+                """))
+                conn.commit()
+                logging.info("Converted interview_sessions.final_report to jsonb")
+
+            # 3-3-3. 저카디널리티 단일 컬럼 인덱스 제거 → 조회 패턴에 맞는 복합 인덱스로 대체
+            # (idx_rc_record_category는 chunk_index까지 포함한 인덱스로 대체 - 정렬 단계 제거)
+            for index_name in ['ix_record_chunks_category', 'ix_questions_category', 'ix_questions_difficulty',
+                               'idx_rc_record_category']:
+                conn.execute(text(f"DROP INDEX IF EXISTS {index_name}"))
+            conn.execute(text("""
+                CREATE INDEX IF NOT EXISTS idx_rc_record_category_chunk
+                ON record_chunks (record_id, category, chunk_index)
+            """))
+            conn.execute(text("""
+                CREATE INDEX IF NOT EXISTS idx_q_set_cat_diff
+                ON questions (set_id, category, difficulty)
+            """))
+            conn.commit()
+
+            # 3-3-4. 상태/난이도 문자열 컬럼 → native ENUM 변환
+            enum_columns = [
+                # (테이블, 컬럼, 타입명, 허용 값, 기본값)
+                ('student_records', 'status', 'record_status', ['PENDING', 'ANALYZING', 'READY', 'FAILED'], 'PENDING'),
+                ('questions', 'difficulty', 'question_difficulty', ['기본', '압박', '심화'], '기본'),
+            ]
+            for table_name, col_name, type_name, values, default in enum_columns:
+                result = conn.execute(text("""
+                    SELECT data_type FROM information_schema.columns
+                    WHERE table_name = :table AND column_name = :col
+                """), {'table': table_name, 'col': col_name})
+
+                if result.scalar() != 'character varying':
+                    continue
+
+                labels = ", ".join(f"'{v}'" for v in values)
+                conn.execute(text(f"""
+                    DO $$ BEGIN
+                        CREATE TYPE {type_name} AS ENUM ({labels});
+                    EXCEPTION WHEN duplicate_object THEN NULL;
+                    END $$
+                """))
+                conn.execute(text(f"ALTER TABLE {table_name} DROP CONSTRAINT IF EXISTS {table_name}_{col_name}_check"))
+                conn.execute(text(f"ALTER TABLE {table_name} ALTER COLUMN {col_name} DROP DEFAULT"))
+                conn.execute(text(f"""
+                    ALTER TABLE {table_name}
+                    ALTER COLUMN {col_name} TYPE {type_name} USING {col_name}::{type_name}
+                """))
+                conn.execute(text(f"ALTER TABLE {table_name} ALTER COLUMN {col_name} SET DEFAULT '{default}'"))
+                conn.commit()
+                logging.info(f"Converted {table_name}.{col_name} to {type_name} enum")
+
+            # 3-3-6. PK와 중복되는 단일 컬럼 인덱스 제거 (PK 제약조건이 이미 유니크 인덱스 보유)
+            for table in (
+                "users", "student_records", "record_chunks", "question_sets",
+                "questions", "interview_sessions", "interview_turns",
+            ):
+                conn.execute(text(f"DROP INDEX IF EXISTS ix_{table}_id"))
+            conn.commit()
+
+            # 3-3-8. users.updated_at 갱신을 BEFORE UPDATE 트리거로 처리 (ORM onupdate 대체)
+            conn.execute(text("""
+                CREATE OR REPLACE FUNCTION set_updated_at() RETURNS trigger AS $$
+                BEGIN
+                    NEW.updated_at := now();
+                    RETURN NEW;
+                END
+                $$ LANGUAGE plpgsql
+            """))
+            conn.execute(text("DROP TRIGGER IF EXISTS users_set_updated_at ON users"))
+            conn.execute(text("""
+                CREATE TRIGGER users_set_updated_at
+                BEFORE UPDATE ON users
+                FOR EACH ROW EXECUTE FUNCTION set_updated_at()
+            """))
+            conn.commit()
+
+            # 3-4. HNSW 인덱스 생성 (m/ef_construction은 RecordChunk 모델 선언과 동일한 값 사용)
+            try:
+                from app.vector_tuning import HNSW_M, HNSW_EF_CONSTRUCTION
+
+                hnsw_params = {'m': HNSW_M, 'ef_construction': HNSW_EF_CONSTRUCTION}
+
+                # 기존 인덱스의 빌드 파라미터가 선언과 다르면 (파라미터 없음 포함) 재생성
+                result = conn.execute(text("""
+                    SELECT reloptions FROM pg_class
+                    WHERE relname = 'record_chunks_embedding_idx'
+                """))
+                row = result.fetchone()
+                expected_options = {f"{k}={v}" for k, v in hnsw_params.items()}
+                if row is not None and set(row[0] or []) != expected_options:
+                    conn.execute(text("DROP INDEX IF EXISTS record_chunks_embedding_idx"))
+                    logging.info(f"Dropped HNSW index with outdated options {row[0]} for rebuild")
+
+                # 인덱스 빌드용 메모리/병렬 워커 (설정된 경우에만, 현재 세션에만 적용)
+                if settings.hnsw_build_maintenance_work_mem:
+                    conn.execute(
+                        text("SELECT set_config('maintenance_work_mem', :value, false)"),
+                        {"value": settings.hnsw_build_maintenance_work_mem}
+                    )
+                if settings.hnsw_build_parallel_workers is not None:
+                    conn.execute(
+                        text("SELECT set_config('max_parallel_maintenance_workers', :value, false)"),
+                        {"value": str(settings.hnsw_build_parallel_workers)}
+                    )
+                conn.execute(text(f"""
                     CREATE INDEX IF NOT EXISTS record_chunks_embedding_idx
-                    ON record_chunks USING hnsw (embedding vector_cosine_ops)
+                    ON record_chunks USING hnsw (embedding halfvec_cosine_ops)
+                    WITH (m = {hnsw_params['m']}, ef_construction = {hnsw_params['ef_construction']})
                 """))
                 conn.commit()
-                logging.info("Created/verified HNSW index for embedding column")
+                logging.info(f"Created/verified HNSW index for embedding column ({hnsw_params})")
             except Exception as idx_err:
+                conn.rollback()
                 logging.warning(f"Index creation warning: {idx_err}")
 
         logging.info("Database tables created/verified successfully")
@@ -157,6 +286,31 @@ async def startup_event():
         logging.error(f"Error setting up database: {e}")
         raise
 
+    # 5. TTS gRPC 채널 워밍업 (첫 음성 면접 요청의 지연 제거)
+    # 시작을 막지 않도록 백그라운드 태스크로 실행 (실패/타임아웃은 로그만 남김)
+    if settings.tts_warm_up_enabled:
+        import asyncio
+
+        app.state.tts_warm_up_task = asyncio.create_task(_warm_up_tts())
+
+
+async def _warm_up_tts():
+    """TTS 클라이언트 워밍업 (타임아웃 적용, 예외는 로그로만 처리)"""
+    import asyncio
+
+    timeout = settings.tts_warm_up_timeout
+    try:
+        from app.services.audio_service import audio_service
+
+        await asyncio.wait_for(
+            asyncio.to_thread(audio_service.warm_up, timeout),
+            timeout=timeout + 1
+        )
+    except asyncio.TimeoutError:
+        logging.warning(f"TTS warm-up timed out after {timeout}s")
+    except Exception as e:
+        logging.warning(f"TTS warm-up skipped: {e}")
+
 
 @app.get("/health")
 async def health_check():
@@ -0,0 +1,118 @@
+-- 면접 대화 턴 테이블
+-- interview_sessions.interview_logs(JSON)를 정규화한 테이블 (질문/답변 1쌍 = 1행)
+-- 기존 DB는 이 파일을 직접 실행해 이관 (앱 시작 시 자동 실행하지 않음, 단일 트랜잭션)
+--
+-- 배포 순서 (필수):
+--   1. 이 마이그레이션 실행
+--   2. interview_turns를 사용하는 애플리케이션 배포
+-- 새 코드는 interview_turns만 읽고 쓰므로, 순서가 바뀌면 이관 전까지 과거 면접의 대화 기록이 비어 보입니다.
+-- 순서가 바뀌어 진행 중이던 면접에 새 턴이 먼저 기록된 경우에도 안전하도록,
+-- 이관은 세션이 아닌 JSON 항목 단위로 수행하고 기존 턴은 JSON 항목 뒤로 밀어 순서를 보존합니다.
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS interview_turns (
+    id BIGSERIAL PRIMARY KEY,
+    session_id BIGINT NOT NULL,
+    turn_index INTEGER NOT NULL,
+
+    -- 대화 내용
+    question TEXT,
+    answer TEXT,
+    response_time INTEGER DEFAULT 0,
+    sub_topic VARCHAR(100),
+
+    -- 외래 키
+    CONSTRAINT fk_turn_session FOREIGN KEY (session_id) REFERENCES interview_sessions(id) ON DELETE CASCADE,
+    -- 세션 내 턴 번호 중복 방지 (동시 저장 시 max()+1 경합 포함)
+    CONSTRAINT uq_interview_turns_session_turn UNIQUE (session_id, turn_index)
+);
+
+-- 기존 테이블: 중복 턴 번호를 세션별 0..n-1로 재정렬한 뒤 일반 인덱스를 UNIQUE 제약조건으로 교체
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM pg_constraint WHERE conname = 'uq_interview_turns_session_turn'
+    ) THEN
+        UPDATE interview_turns t
+        SET turn_index = r.new_index
+        FROM (
+            SELECT id, (ROW_NUMBER() OVER (PARTITION BY session_id ORDER BY turn_index, id) - 1)::int AS new_index
+            FROM interview_turns
+        ) r
+        WHERE t.id = r.id AND t.turn_index <> r.new_index;
+
+        ALTER TABLE interview_turns
+            ADD CONSTRAINT uq_interview_turns_session_turn UNIQUE (session_id, turn_index);
+    END IF;
+END $$;
+
+DROP INDEX IF EXISTS idx_interview_turns_session_turn;
+
+-- 기존 interview_logs 데이터 이관 → 세션별 검증 후에만 컬럼 제거
+-- (이미 컬럼이 없으면 건너뜀 / 한 세션이라도 턴 수가 맞지 않으면 예외로 전체 롤백)
+DO $$
+DECLARE
+    mismatched_sessions BIGINT;
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM information_schema.columns
+        WHERE table_name = 'interview_sessions' AND column_name = 'interview_logs'
+    ) THEN
+        RETURN;
+    END IF;
+
+    -- 세션별 JSON 항목 수
+    EXECUTE $q$
+        CREATE TEMP TABLE tmp_log_counts ON COMMIT DROP AS
+        SELECT id AS session_id, jsonb_array_length(interview_logs::jsonb) AS log_count
+        FROM interview_sessions
+        WHERE interview_logs IS NOT NULL
+          AND jsonb_array_length(interview_logs::jsonb) > 0
+    $q$;
+
+    -- 새 코드가 먼저 기록한 턴을 JSON 항목 수만큼 뒤로 이동 (UNIQUE 충돌을 피하려고 음수를 거쳐 2단계로 갱신)
+    UPDATE interview_turns t
+    SET turn_index = -(t.turn_index + 1)
+    FROM tmp_log_counts c
+    WHERE t.session_id = c.session_id;
+
+    UPDATE interview_turns t
+    SET turn_index = -t.turn_index - 1 + c.log_count
+    FROM tmp_log_counts c
+    WHERE t.session_id = c.session_id;
+
+    -- JSON 항목을 0..n-1 턴으로 삽입 (항목 단위)
+    EXECUTE $q$
+        INSERT INTO interview_turns (session_id, turn_index, question, answer, response_time, sub_topic)
+        SELECT s.id,
+               (e.ordinality - 1)::int,
+               e.value->>'question',
+               e.value->>'answer',
+               COALESCE((e.value->>'response_time')::numeric::int, 0),
+               e.value->>'sub_topic'
+        FROM interview_sessions s
+        JOIN tmp_log_counts c ON c.session_id = s.id
+        CROSS JOIN LATERAL jsonb_array_elements(s.interview_logs::jsonb) WITH ORDINALITY AS e(value, ordinality)
+    $q$;
+
+    -- 세션별 검증: 0..n-1 구간의 턴 수가 JSON 항목 수와 같아야 함
+    SELECT COUNT(*) INTO mismatched_sessions
+    FROM tmp_log_counts c
+    WHERE c.log_count <> (
+        SELECT COUNT(*) FROM interview_turns t
+        WHERE t.session_id = c.session_id AND t.turn_index < c.log_count
+    );
+
+    IF mismatched_sessions > 0 THEN
+        RAISE EXCEPTION 'interview_turns backfill mismatch in % session(s)', mismatched_sessions;
+    END IF;
+
+    ALTER TABLE interview_sessions DROP COLUMN interview_logs;
+END $$;
+
+COMMENT ON TABLE interview_turns IS '면접 대화 턴 - 질문/답변/응답 시간 (interview_sessions 하위)';
+COMMENT ON COLUMN interview_turns.turn_index IS '턴 순서 (0: 자기소개)';
+COMMENT ON COLUMN interview_turns.response_time IS '답변 소요 시간 (초 단위)';
+
+COMMIT;
@@ -5,7 +5,7 @@
 import asyncio
 from pathlib import Path
 from app.graphs.interview_graph import interview_graph
-from app.graphs.record_analysis import question_generation_graph
+from app.graphs.record_analysis import get_question_generation_graph
 
 
 def visualize_interview_graph():
@@ -53,7 +53,7 @@ def visualize_question_generation_graph():
     # 1. ASCII 아트
     try:
         print("🎨 ASCII 아트 생성 중...")
-        ascii_art = question_generation_graph.graph.get_graph().draw_ascii()
+        ascii_art = get_question_generation_graph().graph.get_graph().draw_ascii()
         with open("docs/question_generation_graph_ascii.txt", "w", encoding="utf-8") as f:
             f.write(ascii_art)
         print("✅ question_generation_graph_ascii.txt 저장 완료")
@@ -69,7 +69,7 @@ def visualize_question_generation_graph():
     # 2. Mermaid PNG
     try:
         print("\n📸 Mermaid PNG 생성 중...")
-        question_generation_graph.graph.get_graph().draw_mermaid_png(
+        get_question_generation_graph().graph.get_graph().draw_mermaid_png(
             output_file_path=Path("docs/question_generation_graph.png")
         )
         print("✅ question_generation_graph.png 저장 완료")
@@ -98,7 +98,7 @@ def print_graph_info():
     # 질문 생성 그래프
     print("\n📝 질문 생성 그래프:")
     try:
-        drawable = question_generation_graph.graph.get_graph()
+        drawable = get_question_generation_graph().graph.get_graph()
         print(f"  노드 수: {len(list(drawable.nodes))}")
         print(f"  노드: {list(drawable.nodes)}")
     except Exception as e: